@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the vmware_rest_api plugin
+
+Runs import_vms and both inventorize modes against the local fake vCenter
+(fake_vcenter.py) with stub Host/run_inventory objects, so no CMDBSyncer
+installation, database or real vCenter is needed. Every scenario runs in its
+own process and reports VMs/s, p50/p99 per-VM detail latency and peak RSS.
+
+Only click, requests, urllib3 and pymongo need to be installed.
+
+Usage:
+    python bench_vmware_rest.py --vms 8000 --latency-ms 150 --workers 16
+    python bench_vmware_rest.py --vms 10000 --enumeration-mode host --json
+"""
+
+import argparse
+import importlib.util
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import types
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_vcenter import start_server  # pylint: disable=wrong-import-position
+
+PLUGIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', 'plugin', 'vmware_rest_api.py')
+
+SCENARIOS = ('import', 'inventorize', 'individual', 'sync')
+
+
+class StubCollection:
+    """
+    In-memory replacement for the Host collection, for bulk writes.
+    """
+
+    # Shared by all instances, _get_collection() returns a new one per flush
+    ids = itertools.count(1)
+
+    def __init__(self, store):
+        self.store = store
+
+    def bulk_write(self, operations, ordered=True):  # pylint: disable=unused-argument
+        """Apply InsertOne/UpdateOne operations to the store"""
+        for operation in operations:
+            document = operation._doc  # pylint: disable=protected-access
+            if 'hostname' in document:
+                document['_id'] = next(self.ids)
+                self.store[document['hostname']] = dict(document)
+            else:
+                filter_id = operation._filter['_id']  # pylint: disable=protected-access
+                for record in self.store.values():
+                    if record['_id'] == filter_id:
+                        record.update(document.get('$set', {}))
+
+
+class StubQuery:
+    """
+    Minimal queryset: filter by hostname__in, only/exclude and update.
+    """
+
+    def __init__(self, store, hostnames):
+        self.store = store
+        self.hostnames = hostnames
+
+    def only(self, *_fields):
+        """Projection is irrelevant in memory"""
+        return self
+
+    def exclude(self, *_fields):
+        """Projection is irrelevant in memory"""
+        return self
+
+    def update(self, **_kwargs):
+        """Touch the matching records"""
+        return len([name for name in self.hostnames if name in self.store])
+
+    def __iter__(self):
+        for hostname in self.hostnames:
+            if hostname in self.store:
+                yield StubHost.from_record(self.store[hostname])
+
+
+class StubHost:
+    """
+    Stand-in for syncerapi.v1.Host with the methods the plugin uses.
+    """
+
+    store = {}
+
+    def __init__(self, hostname):
+        self.id = None
+        self.hostname = hostname
+        self.labels = {}
+        self.inventory = {}
+        self.cache = {}
+        self._changed = {}
+
+    @classmethod
+    def from_record(cls, record):
+        """Build a host from a stored record"""
+        host_obj = cls(record['hostname'])
+        host_obj.id = record['_id']
+        host_obj.labels = dict(record.get('labels', {}))
+        host_obj.cache = dict(record.get('cache', {}))
+        return host_obj
+
+    @classmethod
+    def get_host(cls, hostname, create=True):
+        """Return existing or new host"""
+        if hostname in cls.store:
+            return cls.from_record(cls.store[hostname])
+        return cls(hostname) if create else False
+
+    @classmethod
+    def objects(cls, hostname__in=()):
+        """Query by hostnames"""
+        return StubQuery(cls.store, list(hostname__in))
+
+    @classmethod
+    def _get_collection(cls):
+        return StubCollection(cls.store)
+
+    def update_host(self, labels):
+        """Replace labels"""
+        if labels != self.labels:
+            self.labels = labels
+            self._changed['labels'] = labels
+
+    def set_account(self, account_dict=None):  # pylint: disable=unused-argument
+        """Claim the host, save needed if labels changed or new"""
+        return bool(self._changed) or not self.id
+
+    def validate(self):
+        """Always valid"""
+
+    def to_mongo(self):
+        """Serialize a new host"""
+        return {'hostname': self.hostname, 'labels': self.labels, 'cache': self.cache}
+
+    def _delta(self):
+        return dict(self._changed, cache=self.cache), {}
+
+    def _clear_changed_fields(self):
+        self._changed = {}
+
+
+class StubPlugin:
+    """
+    Stand-in for syncerapi.v1.core.Plugin.
+    """
+
+    account_config = {}
+
+    def __init__(self, account):
+        self.config = dict(self.account_config, name=account)
+        self.log_details = []
+        self.debug = False
+
+
+def stub_run_inventory(config, objects):  # pylint: disable=unused-argument
+    """Consume the objects like run_inventory would"""
+    for hostname, labels in objects:
+        if hostname in StubHost.store:
+            StubHost.store[hostname]['inventory'] = labels
+
+
+def stub_inventorize_host(host_obj, labels, key, config):  # pylint: disable=unused-argument
+    """Store the inventory of one host"""
+    StubHost.store[host_obj.hostname]['inventory'] = labels
+
+
+def install_stubs():
+    """
+    Register stub syncerapi modules, then load the plugin.
+
+    Returns:
+        module: The loaded vmware_rest_api plugin
+    """
+    core = types.ModuleType('syncerapi.v1.core')
+    core.cli = click.Group()
+    core.Plugin = StubPlugin
+    core.app = None
+    core.logger = types.SimpleNamespace(
+        info=lambda *a, **k: None, debug=lambda *a, **k: None,
+        warning=lambda *a, **k: None, error=print,
+    )
+    v1 = types.ModuleType('syncerapi.v1')
+    v1.register_cronjob = lambda *args: None
+    v1.Host = StubHost
+    inventory = types.ModuleType('syncerapi.v1.inventory')
+    inventory.run_inventory = stub_run_inventory
+    inventory.inventorize_host = stub_inventorize_host
+    sys.modules.update({
+        'syncerapi': types.ModuleType('syncerapi'),
+        'syncerapi.v1': v1,
+        'syncerapi.v1.core': core,
+        'syncerapi.v1.inventory': inventory,
+    })
+
+    spec = importlib.util.spec_from_file_location('vmware_rest_api', PLUGIN_PATH)
+    plugin_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(plugin_module)
+    return plugin_module
+
+
+def percentile(values, share):
+    """Nearest-rank percentile, 0 for no values"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(share * (len(values) - 1))))]
+
+
+def run_scenario(scenario, address, settings, queue):
+    """
+    Run one scenario in a fresh process and report its results.
+    """
+    plugin_module = install_stubs()
+    StubPlugin.account_config = dict(settings, address=address)
+
+    def make_plugin():
+        plugin = plugin_module.VMwareRestApiPlugin('benchmark')
+        # The fake vCenter speaks plain HTTP
+        plugin.base_url = f"http://{address}"
+        plugin.http.mount('http://', plugin.http.adapters['https://'])
+        return plugin
+
+    # Inventorize needs existing hosts, create them outside of the measurement
+    if scenario in ('inventorize', 'individual'):
+        make_plugin().import_vms()
+
+    plugin = make_plugin()
+    latencies = []
+    fetch = plugin._fetch_vm_details  # pylint: disable=protected-access
+
+    def timed_fetch(vm_data):
+        start = time.monotonic()
+        try:
+            return fetch(vm_data)
+        finally:
+            latencies.append(time.monotonic() - start)
+    plugin._fetch_vm_details = timed_fetch  # pylint: disable=protected-access
+
+    start = time.monotonic()
+    if scenario == 'import':
+        plugin.import_vms()
+    elif scenario == 'inventorize':
+        plugin.inventorize_vms(use_bulk=True)
+    elif scenario == 'individual':
+        plugin.inventorize_vms(use_bulk=False)
+    else:
+        plugin.sync_vms()
+    duration = time.monotonic() - start
+
+    queue.put({
+        'scenario': scenario,
+        'vms': len(StubHost.store),
+        'seconds': round(duration, 3),
+        'vms_per_second': round(len(StubHost.store) / duration, 1) if duration else 0,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'phases': {name: round(value, 3) for name, value in plugin.metrics.phases.items()},
+    })
+
+
+def main():
+    """Run the selected scenarios and print a report"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vms', type=int, default=2000, help="Synthetic VMs")
+    parser.add_argument('--latency-ms', type=float, default=20, help="Latency per request")
+    parser.add_argument('--jitter-ms', type=float, default=5, help="Random extra latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of 503 answers")
+    parser.add_argument('--workers', type=int, default=8, help="detail_workers setting")
+    parser.add_argument('--enumeration-mode', default='single',
+                        help="enumeration_mode setting (single, host, ...)")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma separated, from {', '.join(SCENARIOS)}")
+    parser.add_argument('--setting', action='append', default=[], metavar='KEY=VALUE',
+                        help="Additional account setting, repeatable")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    server = start_server(args.vms, args.latency_ms, args.jitter_ms, args.error_rate)
+    address = f"{server.server_address[0]}:{server.server_address[1]}"
+    settings = {
+        'username': 'benchmark',
+        'password': 'benchmark',
+        'detail_workers': str(args.workers),
+        'enumeration_mode': args.enumeration_mode,
+    }
+    settings.update(item.split('=', 1) for item in args.setting)
+
+    # spawn instead of fork: a forked child's peak RSS would include the
+    # parent's pages, i.e. the whole fake inventory
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for scenario in args.scenarios.split(','):
+        queue = context.Queue()
+        process = context.Process(target=run_scenario,
+                                  args=(scenario, address, settings, queue))
+        process.start()
+        results.append(queue.get())
+        process.join()
+    server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.vms} VMs, {args.latency_ms}ms +{args.jitter_ms}ms latency, "
+          f"{args.error_rate:.0%} errors, {args.workers} workers, {args.enumeration_mode}")
+    print(f"{'Scenario':<12} {'VMs':>7} {'Seconds':>8} {'VMs/s':>8} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'RSS MB':>7}")
+    for result in results:
+        print(f"{result['scenario']:<12} {result['vms']:>7} {result['seconds']:>8} "
+              f"{result['vms_per_second']:>8} {result['p50_ms']:>7} {result['p99_ms']:>7} "
+              f"{result['peak_rss_mb']:>7}")
+    if results:
+        print("\nPhases (s):")
+        for result in results:
+            print(f"  {result['scenario']:<12} {result['phases']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the vCenter REST API
+
+Serves a synthetic inventory of N VMs on the endpoints used by the
+vmware_rest_api plugin, with injectable latency and error rate:
+
+- POST /api/session
+- GET  /api/vcenter/vm (with datacenters/clusters/hosts/folders filters)
+- GET  /api/vcenter/vm/{id}
+- GET  /api/vcenter/vm/{id}/guest/identity, /guest/networking, /tools, /hardware
+- GET  /api/vcenter/datacenter, /cluster, /host, /folder
+
+Like a real vCenter, the VM listing refuses to answer when more than
+4000 VMs match, so sharded enumeration can be benchmarked too.
+
+Usage:
+    python fake_vcenter.py --vms 8000 --latency-ms 150 --port 8443
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+SESSION_ID = "fake-session-id"
+
+# Maximum VMs returned by an unfiltered listing, as enforced by vCenter
+LIST_LIMIT = 4000
+
+
+class FakeInventory:
+    """
+    Synthetic vCenter inventory.
+
+    VMs are spread evenly over datacenters, clusters (one per datacenter),
+    hosts and folders, so every shard mode covers all VMs.
+    """
+
+    def __init__(self, vm_count, hosts=50, datacenters=2, folders=20, seed=42):
+        rng = random.Random(seed)
+        self.datacenters = [f"datacenter-{i}" for i in range(1, datacenters + 1)]
+        self.clusters = [f"domain-c{i}" for i in range(1, datacenters + 1)]
+        self.hosts = [f"host-{i}" for i in range(1, hosts + 1)]
+        self.folders = [f"group-v{i}" for i in range(1, folders + 1)]
+        self.vms = []
+        self.details = {}
+        for index in range(vm_count):
+            vm_id = f"vm-{index + 1}"
+            host = self.hosts[index % hosts]
+            datacenter_index = (index % hosts) % datacenters
+            power_state = 'POWERED_ON' if rng.random() < 0.9 else 'POWERED_OFF'
+            summary = {
+                'vm': vm_id,
+                'name': f"bench-vm-{index + 1:06d}",
+                'power_state': power_state,
+                'cpu_count': rng.choice((1, 2, 4, 8)),
+                'memory_size_MiB': rng.choice((1024, 2048, 4096, 8192, 16384)),
+            }
+            self.vms.append({
+                'summary': summary,
+                'datacenters': self.datacenters[datacenter_index],
+                'clusters': self.clusters[datacenter_index],
+                'hosts': host,
+                'folders': self.folders[index % folders],
+            })
+            self.details[vm_id] = {
+                'name': summary['name'],
+                'power_state': power_state,
+                'guest': {
+                    'hostname': f"{summary['name']}.bench.local",
+                    'ip_address': f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+                    'full_name': 'Ubuntu Linux (64-bit)',
+                    'tools_status': 'RUNNING',
+                } if power_state == 'POWERED_ON' else {},
+                'config': {
+                    'uuid': f"4201{index:028x}",
+                    'guest_id': 'UBUNTU_64',
+                    'annotation': f"Benchmark VM {index + 1}",
+                },
+                'hardware': {'version': 'VMX_19'},
+                'cpu': {'count': summary['cpu_count']},
+                'memory': {'size_MiB': summary['memory_size_MiB']},
+                'disks': {str(2000 + n): {'label': f"Hard disk {n + 1}"} for n in range(2)},
+                'nics': {'4000': {'label': 'Network adapter 1'}},
+            }
+
+    def list_vms(self, filters):
+        """
+        Return the VM summaries matching all given filters.
+        """
+        result = []
+        for vm in self.vms:
+            if all(vm[key] in values for key, values in filters.items()):
+                result.append(vm['summary'])
+        return result
+
+
+class FakeVcenterHandler(BaseHTTPRequestHandler):
+    """
+    Request handler, configured through the server attributes.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; avoid delayed ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep the benchmark output clean"""
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay_or_fail(self):
+        """
+        Apply the injected latency; return True if this request should fail.
+        """
+        server = self.server
+        latency = server.latency + random.uniform(0, server.jitter)
+        if latency:
+            time.sleep(latency)
+        with server.lock:
+            server.request_count += 1
+        return random.random() < server.error_rate
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Login"""
+        self._delay_or_fail()
+        if urlparse(self.path).path == '/api/session':
+            self._send_json(201, SESSION_ID)
+        else:
+            self._send_json(404, {'error_type': 'NOT_FOUND'})
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Listings and VM details"""
+        failed = self._delay_or_fail()
+        if self.headers.get('vmware-api-session-id') != SESSION_ID:
+            self._send_json(401, {'error_type': 'UNAUTHENTICATED'})
+            return
+        if failed:
+            self._send_json(503, {'error_type': 'SERVICE_UNAVAILABLE'})
+            return
+
+        inventory = self.server.inventory
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip('/')
+
+        if path == '/api/vcenter/vm':
+            filters = {
+                key: set(values) for key, values in query.items()
+                if key in ('datacenters', 'clusters', 'hosts', 'folders')
+            }
+            vms = inventory.list_vms(filters)
+            if len(vms) > LIST_LIMIT:
+                self._send_json(400, {'error_type': 'UNABLE_TO_ALLOCATE_RESOURCE',
+                                      'messages': [{'default_message':
+                                                    "Too many virtual machines. Add more "
+                                                    "filter criteria to reduce the number."}]})
+                return
+            self._send_json(200, vms)
+        elif path.startswith('/api/vcenter/vm/'):
+            vm_id, _, subresource = path[len('/api/vcenter/vm/'):].partition('/')
+            details = inventory.details.get(vm_id)
+            if not details:
+                self._send_json(404, {'error_type': 'NOT_FOUND'})
+            elif not subresource:
+                self._send_json(200, details)
+            elif subresource == 'hardware':
+                self._send_json(200, details['hardware'])
+            elif subresource == 'tools':
+                run_state = 'RUNNING' if details['guest'] else 'NOT_RUNNING'
+                self._send_json(200, {'run_state': run_state})
+            elif not details['guest']:
+                # Guest operations need running VMware Tools
+                self._send_json(503, {'error_type': 'SERVICE_UNAVAILABLE'})
+            elif subresource == 'guest/identity':
+                guest = details['guest']
+                self._send_json(200, {
+                    'name': details['config']['guest_id'],
+                    'family': 'LINUX',
+                    'full_name': {'default_message': guest['full_name']},
+                    'host_name': guest['hostname'],
+                    'ip_address': guest['ip_address'],
+                })
+            elif subresource == 'guest/networking':
+                self._send_json(200, {'dns_values': {'domain_name': 'bench.local',
+                                                     'host_name': details['name']}})
+            else:
+                self._send_json(404, {'error_type': 'NOT_FOUND'})
+        elif path == '/api/vcenter/datacenter':
+            self._send_json(200, [{'datacenter': x, 'name': x} for x in inventory.datacenters])
+        elif path == '/api/vcenter/cluster':
+            self._send_json(200, [{'cluster': x, 'name': x} for x in inventory.clusters])
+        elif path == '/api/vcenter/host':
+            self._send_json(200, [{'host': x, 'name': x} for x in inventory.hosts])
+        elif path == '/api/vcenter/folder':
+            self._send_json(200, [{'folder': x, 'name': x} for x in inventory.folders])
+        else:
+            self._send_json(404, {'error_type': 'NOT_FOUND'})
+
+
+def start_server(vm_count, latency_ms=0, jitter_ms=0, error_rate=0.0, port=0):
+    """
+    Start the fake vCenter in a background thread.
+
+    Args:
+        vm_count (int): Number of synthetic VMs
+        latency_ms (float): Fixed latency added to every request
+        jitter_ms (float): Random extra latency, up to this value
+        error_rate (float): Share of GET requests answered with 503
+        port (int): Port to listen on, 0 for a free one
+
+    Returns:
+        ThreadingHTTPServer: Running server, see server.server_address
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeVcenterHandler)
+    server.daemon_threads = True
+    server.inventory = FakeInventory(vm_count)
+    server.latency = latency_ms / 1000
+    server.jitter = jitter_ms / 1000
+    server.error_rate = error_rate
+    server.request_count = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """Run the fake vCenter in the foreground"""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vms', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=8443)
+    args = parser.parse_args()
+
+    server = start_server(args.vms, args.latency_ms, args.jitter_ms, args.error_rate, args.port)
+    print(f"Fake vCenter with {args.vms} VMs on http://{server.server_address[0]}:"
+          f"{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
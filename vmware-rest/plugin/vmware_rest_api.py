@@ -16,9 +16,26 @@ Improvements based on feedback from Bastian Kuhn:
 """
 
 import click
+import codecs
+import fnmatch
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import re
+import sqlite3
 import requests
 import urllib3
 import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 
 # Improvement #3: Import from syncerapi.v1.core instead of application
 from syncerapi.v1.core import (
@@ -36,6 +53,571 @@ from syncerapi.v1.inventory import run_inventory, inventorize_host
 # Disable SSL warnings for self-signed certificates
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Sharded enumeration: mode -> (endpoint listing the shards, id field, VM list filter)
+# /api/vcenter/vm refuses to answer when more than 4000 VMs match, so big
+# vCenters are listed per shard and merged.
+SHARD_FILTERS = {
+    'datacenter': ('/api/vcenter/datacenter', 'datacenter', 'datacenters'),
+    'cluster': ('/api/vcenter/cluster', 'cluster', 'clusters'),
+    'host': ('/api/vcenter/host', 'host', 'hosts'),
+    'folder': ('/api/vcenter/folder?type=VIRTUAL_MACHINE', 'folder', 'folders'),
+}
+
+# Host.cache key holding the fingerprint of the last imported labels
+FINGERPRINT_KEY = 'vmware_rest_fingerprint'
+
+# Labels which change on every run and must not count as a change
+VOLATILE_LABELS = ('last_import', 'last_inventory')
+
+# Host prefetch projections: import never touches the inventory,
+# inventorize only needs the inventory itself
+IMPORT_EXCLUDED_FIELDS = ('inventory',)
+INVENTORY_FIELDS = ('hostname', 'inventory', 'last_import_sync')
+
+# Lightweight VM sub-resources for detail_mode "fields":
+# name -> (path below /api/vcenter/vm/{id}, needs a powered on VM, needs running tools)
+DETAIL_SUBRESOURCES = {
+    'guest_identity': ('/guest/identity', True, True),
+    'guest_networking': ('/guest/networking', True, True),
+    'tools': ('/tools', True, False),
+    'hardware': ('/hardware', False, False),
+}
+
+# VMware Tools run states in which guest data is available
+TOOLS_RUNNING_STATES = ('RUNNING', 'EXECUTING_SCRIPTS')
+DEFAULT_DETAIL_FIELDS = 'guest_identity,tools,hardware'
+
+# HTTP status codes vCenter uses when it is overloaded
+THROTTLE_STATUS_CODES = (429, 503)
+
+# Guest sub-resources answer 503 when VMware Tools is not running; that
+# is not throttling, so only 429 counts for them
+GUEST_THROTTLE_STATUS_CODES = (429,)
+
+# Upper bound in seconds of one retry delay, also for Retry-After
+MAX_RETRY_DELAY = 30
+
+
+def iter_json_array(response, chunk_size=65536):
+    """
+    Parse a streamed JSON array response element by element.
+
+    Only the current network chunk and one partial element are kept in
+    memory, instead of the whole document as with response.json(). A
+    response ending before the closing bracket raises ValueError.
+
+    Args:
+        response (requests.Response): Response requested with stream=True
+        chunk_size (int): Bytes read per network chunk
+
+    Yields:
+        object: Each element of the top level array
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    started = False
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        buffer += text_decoder.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Element not complete yet, wait for the next chunk
+                break
+            # A number cut at a chunk boundary decodes as well, so an element
+            # is only complete once a delimiter follows it
+            if end >= len(buffer) or buffer[end] not in ' \t\r\n,]':
+                break
+            pos = end
+            yield element
+        buffer = buffer[pos:]
+    # Only reached when the stream ended before the closing bracket
+    raise ValueError("Truncated JSON array")
+
+
+class RequestBudgetExceeded(Exception):
+    """
+    Raised when the per-account request budget of a run is used up.
+    """
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket with adaptive concurrency, shared by all workers of a plugin.
+
+    Requests need a token (refilled at `rate` per second) and a concurrency
+    slot. Throttling answers halve both rate and concurrency; latency well
+    above the observed baseline shrinks concurrency by one. Connection
+    errors only interrupt the ramp up. While vCenter is healthy, concurrency
+    grows by one per window of successful requests and the rate by 10%, up
+    to the configured maximums. Without a rate, only concurrency is limited.
+    """
+
+    def __init__(self, rate, max_concurrency, budget=0):
+        """
+        Args:
+            rate (float): Maximum requests per second, 0 for no rate limit
+            max_concurrency (int): Maximum requests in flight
+            budget (int): Maximum requests per run, 0 for no limit
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.budget = budget
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.successes = 0
+        self.baseline = None
+        self.tokens = rate
+        self.last_refill = time.monotonic()
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        Block until a token and a concurrency slot are available.
+        """
+        with self._cond:
+            if self.budget and self.requests >= self.budget:
+                raise RequestBudgetExceeded(f"Request budget of {self.budget} exhausted")
+            self.requests += 1
+            if not self.max_rate:
+                while self.in_flight >= self.concurrency:
+                    self._cond.wait()
+                self.in_flight += 1
+                return
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.in_flight < self.concurrency and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+                self._cond.wait(max(0.01, (1 - self.tokens) / self.rate))
+
+    def release(self, latency, throttled=False, error=False):
+        """
+        Free the slot and adapt rate and concurrency to the outcome.
+
+        Args:
+            latency (float): Duration of the request in seconds
+            throttled (bool): vCenter answered with a throttling status
+            error (bool): The request failed without an answer
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if error:
+                # Says nothing about vCenter load, and the latency is meaningless
+                self.errors += 1
+                self.successes = 0
+            elif throttled:
+                self.throttled += 1
+                self.successes = 0
+                self.concurrency = max(1, self.concurrency // 2)
+                if self.max_rate:
+                    self.rate = max(1.0, self.rate / 2)
+            else:
+                if self.baseline is None:
+                    self.baseline = latency
+                else:
+                    self.baseline = 0.95 * self.baseline + 0.05 * latency
+                if latency > 3 * self.baseline and self.concurrency > 1:
+                    self.concurrency -= 1
+                    self.successes = 0
+                else:
+                    self.successes += 1
+                    if self.successes >= self.concurrency:
+                        self.successes = 0
+                        self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                        self.rate = min(self.max_rate, self.rate * 1.1)
+            self._cond.notify_all()
+
+
+class RunMetrics:
+    """
+    Timing and API metrics of one plugin run.
+
+    Records wall time per phase (phases may nest, e.g. a re-authentication
+    during the detail fetch counts for both), request counts and latency
+    histograms per endpoint, plus free counters like retries and errors.
+    """
+
+    # Upper bounds in seconds of the latency histogram buckets
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.phases = {}
+        self.endpoints = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Measure the wall time of a block; repeated blocks accumulate.
+
+        Args:
+            name (str): Phase name, e.g. enumerate or db_write
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + time.monotonic() - start
+
+    def count(self, name, value=1):
+        """
+        Increase a counter.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe_request(self, endpoint, latency, error=False):
+        """
+        Record one API request.
+
+        Args:
+            endpoint (str): Endpoint template, e.g. /api/vcenter/vm/{id}
+            latency (float): Duration in seconds
+            error (bool): Request failed
+        """
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {
+                'count': 0, 'errors': 0, 'sum': 0.0, 'buckets': [0] * len(self.BUCKETS),
+            })
+            stats['count'] += 1
+            stats['sum'] += latency
+            if error:
+                stats['errors'] += 1
+            for index, bound in enumerate(self.BUCKETS):
+                if latency <= bound:
+                    stats['buckets'][index] += 1
+
+    def as_dict(self):
+        """
+        Return all metrics as a JSON serializable dict.
+        """
+        return {
+            'phases': {name: round(value, 3) for name, value in self.phases.items()},
+            'endpoints': self.endpoints,
+            'counters': self.counters,
+            'buckets': list(self.BUCKETS),
+        }
+
+    def to_log_details(self, log_details):
+        """
+        Append a readable summary to the plugin log_details.
+        """
+        for name, value in self.phases.items():
+            log_details.append((f'time_{name}', f"{value:.2f}s"))
+        for endpoint, stats in self.endpoints.items():
+            average = stats['sum'] / stats['count'] if stats['count'] else 0
+            log_details.append((f'requests {endpoint}',
+                                f"{stats['count']} ({stats['errors']} errors, "
+                                f"avg {average * 1000:.0f}ms)"))
+        for name, value in self.counters.items():
+            log_details.append((name, str(value)))
+
+    def write(self, path, account):
+        """
+        Write the metrics to a file, replacing it atomically.
+
+        Files ending in .prom are written in the Prometheus textfile format
+        (for the node_exporter textfile collector), all others as JSON.
+
+        Args:
+            path (str): Target file
+            account (str): Account name, used as label
+        """
+        if path.endswith('.prom'):
+            content = self._prometheus(account)
+        else:
+            content = json.dumps(dict(self.as_dict(), account=account,
+                                      timestamp=int(time.time())), indent=2)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as metrics_file:
+            metrics_file.write(content)
+        os.replace(tmp_path, path)
+
+    def _prometheus(self, account):
+        """
+        Render the metrics in the Prometheus text format.
+        """
+        lines = ['# TYPE vmware_rest_phase_seconds gauge']
+        for name, value in self.phases.items():
+            lines.append(f'vmware_rest_phase_seconds{{account="{account}",phase="{name}"}} {value:.3f}')
+        lines.append('# TYPE vmware_rest_request_seconds histogram')
+        for endpoint, stats in self.endpoints.items():
+            labels = f'account="{account}",endpoint="{endpoint}"'
+            for bound, bucket in zip(self.BUCKETS, stats['buckets']):
+                lines.append(f'vmware_rest_request_seconds_bucket{{{labels},le="{bound}"}} {bucket}')
+            lines.append(f'vmware_rest_request_seconds_bucket{{{labels},le="+Inf"}} {stats["count"]}')
+            lines.append(f'vmware_rest_request_seconds_sum{{{labels}}} {stats["sum"]:.3f}')
+            lines.append(f'vmware_rest_request_seconds_count{{{labels}}} {stats["count"]}')
+        lines.append('# TYPE vmware_rest_request_errors_total counter')
+        for endpoint, stats in self.endpoints.items():
+            lines.append(f'vmware_rest_request_errors_total{{account="{account}",'
+                         f'endpoint="{endpoint}"}} {stats["errors"]}')
+        lines.append('# TYPE vmware_rest_events_total counter')
+        for name, value in self.counters.items():
+            lines.append(f'vmware_rest_events_total{{account="{account}",event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+class HostBulkWriter:
+    """
+    Collect modified Host documents and write them in bulk.
+
+    Instead of one save() round trip per host, documents are queued and
+    flushed in chunks with a single unordered bulk_write. Like save(), only
+    the changed fields of existing documents are written, so documents loaded
+    with a projection are safe. Failures are reported per document, without
+    losing the rest of the chunk. A host queued twice before a flush is
+    written once, with all its changes.
+    """
+
+    def __init__(self, batch_size, log_details, metrics=None):
+        """
+        Args:
+            batch_size (int): Documents per bulk operation
+            log_details (list): Plugin log_details, receives per-document errors
+            metrics (RunMetrics): Receives the db_write phase time
+        """
+        self.batch_size = batch_size
+        self.log_details = log_details
+        self.metrics = metrics or RunMetrics()
+        self.pending = []
+        self._pending_ids = set()
+        self.written = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+
+    def add(self, host_obj):
+        """
+        Queue a host for writing, flushing when the batch is full.
+
+        Args:
+            host_obj (Host): New or modified host document
+        """
+        if id(host_obj) in self._pending_ids:
+            return
+        self._pending_ids.add(id(host_obj))
+        self.pending.append(host_obj)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all queued hosts with one bulk operation.
+        """
+        if not self.pending:
+            return
+
+        with self.metrics.phase('db_write'):
+            self._flush()
+
+    def _flush(self):
+        """
+        Build and run the bulk operation for the queued hosts.
+        """
+        operations = []
+        documents = []
+        for host_obj in self.pending:
+            try:
+                host_obj.validate()
+            except Exception as e:
+                self._report(host_obj, e)
+                continue
+            if host_obj.id:
+                mongo_doc = None
+                set_data, unset_data = host_obj._delta()
+                update = {}
+                if set_data:
+                    update['$set'] = set_data
+                if unset_data:
+                    update['$unset'] = unset_data
+                if not update:
+                    continue
+                operations.append(UpdateOne({'_id': host_obj.id}, update))
+            else:
+                # pymongo sets the new _id on mongo_doc
+                mongo_doc = host_obj.to_mongo()
+                operations.append(InsertOne(mongo_doc))
+            documents.append((host_obj, mongo_doc))
+        self.pending = []
+        self._pending_ids = set()
+
+        if not operations:
+            return
+
+        failed_indexes = set()
+        try:
+            Host._get_collection().bulk_write(operations, ordered=False)
+        except BulkWriteError as bwe:
+            for error in bwe.details.get('writeErrors', []):
+                failed_indexes.add(error['index'])
+                self._report(documents[error['index']][0], error.get('errmsg', error))
+        except Exception as e:
+            for host_obj, _ in documents:
+                self._report(host_obj, e)
+            return
+
+        for index, (host_obj, mongo_doc) in enumerate(documents):
+            if index in failed_indexes:
+                continue
+            if mongo_doc is None:
+                self.updated += 1
+            else:
+                host_obj.id = mongo_doc['_id']
+                self.created += 1
+            host_obj._clear_changed_fields()
+            self.written += 1
+
+    def _report(self, host_obj, error):
+        """
+        Record a failed document write.
+        """
+        self.failed += 1
+        self.metrics.count('db_write_errors')
+        logger.error(f"Failed to save host {host_obj.hostname}: {error}")
+        self.log_details.append((f'save_error {host_obj.hostname}', str(error)))
+
+
+class VmDetailsCache:
+    """
+    Persistent sqlite cache for /api/vcenter/vm/{id} responses.
+
+    Entries are stored per scope (vCenter and detail mode, so accounts can
+    share one cache file) and VM id, and expire after one TTL. An entry is
+    invalid as soon as the power state, CPU count or memory size from the
+    VM listing differ from the values seen when it was stored. The number
+    of cached VMs is bounded; least recently used VMs are evicted.
+    """
+
+    def __init__(self, path, ttl, max_entries, scope):
+        """
+        Args:
+            path (str): sqlite database file
+            ttl (int): Seconds an entry stays valid
+            max_entries (int): Maximum number of cached VMs
+            scope (str): vCenter address and detail mode; VM ids are only
+                unique per vCenter, and the details depend on the mode
+        """
+        self.ttl = ttl
+        self.scope = scope
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        # Entries split per field group, written by older versions
+        self.db.execute("DROP TABLE IF EXISTS vm_details")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS vm_cache ("
+            " vm_key TEXT PRIMARY KEY, signature TEXT, fetched_at REAL,"
+            " accessed_at REAL, data TEXT)"
+        )
+        self.db.commit()
+
+    @staticmethod
+    def signature(vm_data):
+        """
+        Build the invalidation signature from the VM listing data.
+
+        Args:
+            vm_data (dict): VM data from /api/vcenter/vm
+
+        Returns:
+            str: Signature of power state, CPU count and memory size
+        """
+        return (f"{vm_data.get('power_state', '')}|{vm_data.get('cpu_count', '')}"
+                f"|{vm_data.get('memory_size_MiB', '')}")
+
+    def _key(self, vm_data):
+        """
+        Build the cache key of a VM, unique across vCenters and detail modes.
+        """
+        return f"{self.scope}/{vm_data.get('vm')}"
+
+    def get_many(self, vms):
+        """
+        Look up the cached details of many VMs and record the access times.
+
+        Args:
+            vms (list): VM data from /api/vcenter/vm
+
+        Returns:
+            list: Cached VM details (or None) in the same order as `vms`
+        """
+        details = [self.get(vm_data) for vm_data in vms]
+        self.db.commit()
+        return details
+
+    def get(self, vm_data):
+        """
+        Look up the cached details of a VM.
+
+        Args:
+            vm_data (dict): VM data from /api/vcenter/vm
+
+        Returns:
+            dict: Cached VM details, or None if missing or stale
+        """
+        vm_key = self._key(vm_data)
+        row = self.db.execute(
+            "SELECT signature, fetched_at, data FROM vm_cache WHERE vm_key = ?", (vm_key,)
+        ).fetchone()
+        now = time.time()
+        if not row or row[0] != self.signature(vm_data) or now - row[1] > self.ttl:
+            return None
+        self.db.execute("UPDATE vm_cache SET accessed_at = ? WHERE vm_key = ?", (now, vm_key))
+        return json.loads(row[2])
+
+    def put_many(self, entries):
+        """
+        Store freshly fetched details in one transaction.
+
+        Args:
+            entries (list): Tuples of (vm_data, vm_details)
+        """
+        now = time.time()
+        rows = [
+            (self._key(vm_data), self.signature(vm_data), now, now, json.dumps(vm_details))
+            for vm_data, vm_details in entries
+        ]
+        self.db.executemany("INSERT OR REPLACE INTO vm_cache VALUES (?, ?, ?, ?, ?)", rows)
+        self.db.commit()
+
+    def evict(self):
+        """
+        Drop the least recently used VMs above max_entries.
+        """
+        self.db.execute(
+            "DELETE FROM vm_cache WHERE vm_key IN ("
+            " SELECT vm_key FROM vm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self.db.commit()
+
 
 class VMwareRestApiPlugin(Plugin):
     """
@@ -47,6 +629,20 @@ class VMwareRestApiPlugin(Plugin):
 
     session_id = None
     base_url = None
+    detail_workers = 8
+    write_batch_size = 500
+    enumeration_mode = 'single'
+    pool_size = None
+    http = None
+    details_cache = None
+    limiter = None
+    max_retries = 4
+    metrics = None
+    stream_listing = False
+    inventory_chunk_size = 500
+    detail_mode = 'full'
+    detail_fields = ()
+    error = None
 
     def __init__(self, account):
         """
@@ -57,6 +653,65 @@ class VMwareRestApiPlugin(Plugin):
         """
         super().__init__(account)
         self.base_url = f"https://{self.config['address']}"
+        self.metrics = RunMetrics()
+        self.detail_workers = max(1, int(self.config.get('detail_workers', self.detail_workers)))
+        self.write_batch_size = max(1, int(self.config.get('write_batch_size',
+                                                           self.write_batch_size)))
+        self.enumeration_mode = self.config.get('enumeration_mode', self.enumeration_mode).lower()
+        self.stream_listing = str(self.config.get('stream_listing', '')).lower() in ('true', '1', 'yes', 'on')
+        self.inventory_chunk_size = max(1, int(self.config.get('inventory_chunk_size',
+                                                               self.inventory_chunk_size)))
+        self.detail_mode = self.config.get('detail_mode', self.detail_mode).lower()
+        self.detail_fields = tuple(
+            field.strip() for field in
+            self.config.get('detail_fields', DEFAULT_DETAIL_FIELDS).split(',')
+            if field.strip() in DETAIL_SUBRESOURCES
+        )
+        if self.enumeration_mode not in SHARD_FILTERS:
+            self.enumeration_mode = 'single'
+
+        # One keep-alive session for the whole run. The pool must be at least
+        # as large as the number of workers, otherwise connections get dropped.
+        self.pool_size = max(self.detail_workers,
+                             int(self.config.get('pool_size', self.detail_workers)))
+        self.http = requests.Session()
+        self.http.verify = False
+        # One extra connection for a streamed listing next to the workers
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size + 1)
+        self.http.mount('https://', adapter)
+        self._auth_lock = threading.Lock()
+
+        self.limiter = AdaptiveRateLimiter(
+            float(self.config.get('rate_limit') or 0),
+            self.detail_workers,
+            int(self.config.get('request_budget', 0)),
+        )
+        self.max_retries = int(self.config.get('max_retries', self.max_retries))
+
+        # Optional persistent cache of VM details, enabled by setting a path
+        if cache_path := self.config.get('cache_path'):
+            # Details of the fields mode lack most of the full document
+            detail_scope = self.detail_mode
+            if self.detail_mode == 'fields':
+                detail_scope = f"fields:{','.join(sorted(self.detail_fields))}"
+            self.details_cache = VmDetailsCache(
+                cache_path,
+                int(self.config.get('cache_ttl', 3600)),
+                int(self.config.get('cache_max_entries', 50000)),
+                f"{self.config['address']}|{detail_scope}",
+            )
+
+    def record_error(self, message):
+        """
+        Log an error that makes the whole run fail, like a failed login or
+        VM listing. The job functions raise the first one after the run.
+
+        Args:
+            message (str): Error message
+        """
+        logger.error(message)
+        if not self.error:
+            self.error = message
 
     def get_session_id(self):
         """
@@ -68,54 +723,254 @@ class VMwareRestApiPlugin(Plugin):
         url = f"{self.base_url}/api/session"
 
         try:
-            response = requests.post(
-                url,
-                auth=(self.config['username'], self.config['password']),
-                verify=False,
-                timeout=30
-            )
+            with self.metrics.phase('auth'):
+                start = time.monotonic()
+                response = self.http.post(
+                    url,
+                    auth=(self.config['username'], self.config['password']),
+                    timeout=30
+                )
+            self.metrics.observe_request('/api/session', time.monotonic() - start,
+                                         error=not response.ok)
 
             if response.ok:
                 self.session_id = response.json()
                 logger.info(f"Session ID obtained successfully")
                 return True
             else:
-                logger.error(f"Failed to obtain session ID: {response.status_code} {response.text}")
+                self.record_error(f"Failed to obtain session ID: {response.status_code} {response.text}")
                 return False
 
         except Exception as e:
-            logger.error(f"Connection error to vCenter: {str(e)}")
+            self.metrics.count('auth_errors')
+            self.record_error(f"Connection error to vCenter: {str(e)}")
             return False
 
+    def _send(self, url, params=None, stream=False, throttle_codes=THROTTLE_STATUS_CODES):
+        """
+        GET with rate limiting and retries.
+
+        Throttling answers (429/503) and connection errors are retried with
+        jittered exponential backoff, honouring Retry-After when vCenter sends it.
+        No single delay exceeds MAX_RETRY_DELAY seconds.
+
+        Args:
+            url (str): Full URL
+            params (dict): Optional query parameters
+            stream (bool): Do not read the body yet, see iter_json_array()
+            throttle_codes (tuple): Status codes handled as throttling
+
+        Returns:
+            requests.Response: Last response
+        """
+        # Metrics are collected per endpoint, not per VM id
+        endpoint = re.sub(r'/vm-\d+', '/{id}', url[len(self.base_url):])
+        for attempt in range(self.max_retries + 1):
+            last_try = attempt == self.max_retries
+            if attempt:
+                self.metrics.count('retries')
+            self.limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = self.http.get(url, headers={"vmware-api-session-id": self.session_id},
+                                         params=params, timeout=30, stream=stream)
+            except requests.exceptions.RequestException:
+                latency = time.monotonic() - start
+                self.limiter.release(latency, error=True)
+                self.metrics.observe_request(endpoint, latency, error=True)
+                self.metrics.count('connection_errors')
+                if last_try:
+                    raise
+                delay = None
+            else:
+                latency = time.monotonic() - start
+                throttled = response.status_code in throttle_codes
+                self.limiter.release(latency, throttled=throttled)
+                self.metrics.observe_request(endpoint, latency, error=not response.ok)
+                if throttled:
+                    self.metrics.count('throttled')
+                if not throttled or last_try:
+                    return response
+                delay = response.headers.get('Retry-After')
+                response.close()
+
+            try:
+                delay = min(MAX_RETRY_DELAY, max(0.0, float(delay)))
+            except (TypeError, ValueError):
+                delay = random.uniform(0, min(MAX_RETRY_DELAY, 0.5 * 2 ** attempt))
+            logger.debug(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1})")
+            time.sleep(delay)
+        return response
+
+    def _api_get(self, path, params=None, stream=False, throttle_codes=THROTTLE_STATUS_CODES):
+        """
+        GET a vCenter REST endpoint over the pooled session.
+
+        If vCenter answers 401 (session expired), re-authenticate once and
+        replay the request. Concurrent workers hitting the same expired
+        session only trigger one new login.
+
+        Args:
+            path (str): API path, e.g. /api/vcenter/vm
+            params (dict): Optional query parameters
+            stream (bool): Do not read the body yet, see iter_json_array()
+            throttle_codes (tuple): Status codes handled as throttling, see _send()
+
+        Returns:
+            requests.Response: Response of the (replayed) request
+        """
+        url = f"{self.base_url}{path}"
+        used_session = self.session_id
+        response = self._send(url, params, stream, throttle_codes)
+        if response.status_code != 401:
+            return response
+        response.close()
+
+        with self._auth_lock:
+            # Another worker may already have renewed the session
+            if self.session_id == used_session:
+                logger.info("vCenter session expired, re-authenticating")
+                if not self.get_session_id():
+                    return response
+        return self._send(url, params, stream, throttle_codes)
+
     def get_vms(self):
         """
         Retrieve all virtual machines from vCenter.
 
+        With `enumeration_mode` set to datacenter, cluster, host or folder,
+        the listing is split into shards, see iter_vms().
+
         Returns:
             list: List of VM data dictionaries
         """
+        with self.metrics.phase('enumerate'):
+            return self._get_vms()
+
+    def _get_vms(self):
+        """
+        Retrieve all virtual machines, see get_vms().
+        """
         if not self.session_id:
             if not self.get_session_id():
                 return []
 
-        url = f"{self.base_url}/api/vcenter/vm"
-        headers = {"vmware-api-session-id": self.session_id}
+        if self.enumeration_mode in SHARD_FILTERS:
+            vms = list(self.iter_vms())
+            logger.info(f"Found {len(vms)} VMs")
+            return vms
 
         try:
-            response = requests.get(url, headers=headers, verify=False, timeout=30)
+            response = self._api_get("/api/vcenter/vm")
 
             if response.ok:
                 vms = response.json()
                 logger.info(f"Found {len(vms)} VMs")
                 return vms
             else:
-                logger.error(f"Failed to retrieve VMs: {response.status_code} {response.text}")
+                self.record_error(f"Failed to retrieve VMs: {response.status_code} {response.text}")
                 return []
 
         except Exception as e:
-            logger.error(f"Error retrieving VMs: {str(e)}")
+            self.record_error(f"Error retrieving VMs: {str(e)}")
             return []
 
+    def iter_vms(self):
+        """
+        Yield all virtual machines from vCenter, shard by shard.
+
+        The shards (datacenters, clusters, hosts or VM folders, depending on
+        `enumeration_mode`) are listed in parallel. VMs are yielded as soon as
+        their shard is complete and deduplicated by VM id, so overlapping
+        shards are harmless. Note that only the host mode is guaranteed to
+        cover every VM; in cluster mode, VMs on standalone hosts are missed.
+        A failed shard is skipped, but fails the run, see record_error().
+
+        Without sharding, the listing is parsed incrementally from the
+        response when `stream_listing` is enabled.
+
+        Yields:
+            dict: VM data dictionary
+        """
+        if self.enumeration_mode not in SHARD_FILTERS:
+            if self.stream_listing:
+                yield from self._stream_vms()
+            else:
+                yield from self.get_vms()
+            return
+
+        if not self.session_id:
+            if not self.get_session_id():
+                return
+
+        shard_path, id_field, vm_filter = SHARD_FILTERS[self.enumeration_mode]
+        try:
+            response = self._api_get(shard_path)
+            if not response.ok:
+                self.record_error(f"Failed to list {self.enumeration_mode} shards: "
+                                  f"{response.status_code} {response.text}")
+                return
+            shard_ids = [shard[id_field] for shard in response.json()]
+        except Exception as e:
+            self.record_error(f"Error listing {self.enumeration_mode} shards: {str(e)}")
+            return
+
+        logger.info(f"Enumerating VMs in {len(shard_ids)} {self.enumeration_mode} shards")
+
+        seen = set()
+        with ThreadPoolExecutor(max_workers=self.detail_workers) as executor:
+            futures = {
+                executor.submit(self._api_get, "/api/vcenter/vm", {vm_filter: shard_id}): shard_id
+                for shard_id in shard_ids
+            }
+            for future in as_completed(futures):
+                shard_id = futures[future]
+                try:
+                    response = future.result()
+                except Exception as e:
+                    # The listing is incomplete, so the run must not count as ok
+                    self.record_error(f"Error retrieving VMs of {shard_id}: {str(e)}")
+                    self.log_details.append(('shard_error', f"{shard_id}: {str(e)}"))
+                    continue
+                if not response.ok:
+                    # Most likely the shard itself is still above the vCenter limit
+                    self.record_error(f"Failed to retrieve VMs of {shard_id}: "
+                                      f"{response.status_code} {response.text}")
+                    self.log_details.append(('shard_error',
+                                             f"{shard_id}: {response.status_code}"))
+                    continue
+                try:
+                    for vm_data in iter_json_array(response):
+                        vm_id = vm_data.get('vm')
+                        if vm_id in seen:
+                            continue
+                        seen.add(vm_id)
+                        yield vm_data
+                except ValueError as e:
+                    self.record_error(f"Incomplete VM listing of {shard_id}: {str(e)}")
+                    self.log_details.append(('shard_error', f"{shard_id}: {str(e)}"))
+
+    def _stream_vms(self):
+        """
+        Yield the unfiltered VM listing while it is being downloaded.
+
+        Yields:
+            dict: VM data dictionary
+        """
+        if not self.session_id:
+            if not self.get_session_id():
+                return
+
+        try:
+            response = self._api_get("/api/vcenter/vm", stream=True)
+            with response:
+                if not response.ok:
+                    self.record_error(f"Failed to retrieve VMs: {response.status_code} {response.text}")
+                    return
+                yield from iter_json_array(response)
+        except Exception as e:
+            self.record_error(f"Error retrieving VMs: {str(e)}")
+
     def get_vm_details(self, vm_id):
         """
         Retrieve detailed information for a specific VM.
@@ -130,11 +985,8 @@ class VMwareRestApiPlugin(Plugin):
             if not self.get_session_id():
                 return None
 
-        url = f"{self.base_url}/api/vcenter/vm/{vm_id}"
-        headers = {"vmware-api-session-id": self.session_id}
-
         try:
-            response = requests.get(url, headers=headers, verify=False, timeout=30)
+            response = self._api_get(f"/api/vcenter/vm/{vm_id}")
 
             if response.ok:
                 return response.json()
@@ -146,55 +998,352 @@ class VMwareRestApiPlugin(Plugin):
             logger.warning(f"Error retrieving VM details for {vm_id}: {str(e)}")
             return None
 
-    def import_vms(self):
+    def get_vm_subresources(self, vm_data):
         """
-        Import VMs as hosts in CMDBSyncer.
+        Retrieve only the configured lightweight sub-resources of a VM.
 
-        Improvement #1: Simplified using get_host() directly without checking existence.
-        The method always returns an object (existing or new), and we use set_account's
-        return value to determine if we should save.
+        VMs which are not powered on get no tools or guest requests, their
+        tools are known not to run. For other VMs, guest sub-resources are
+        skipped when VMware Tools are not running (tools goes first when
+        requested), since there is no guest data to return. The result has
+        the same shape as the relevant parts of get_vm_details().
+
+        Args:
+            vm_data (dict): VM data from /api/vcenter/vm
+
+        Returns:
+            dict: VM details or None if every request failed
         """
-        logger.info("Starting VM import from vCenter")
+        vm_id = vm_data.get('vm')
+        powered_on = vm_data.get('power_state') == 'POWERED_ON'
+        guest = {}
+        config = {}
+        requested = 0
+        failed = 0
+        tools_running = None
+
+        for field in sorted(self.detail_fields, key=lambda name: name != 'tools'):
+            path, needs_power, is_guest = DETAIL_SUBRESOURCES[field]
+            if needs_power and not powered_on:
+                if field == 'tools':
+                    guest['tools_status'] = 'NOT_RUNNING'
+                continue
+            if is_guest and tools_running is False:
+                continue
+            requested += 1
+            try:
+                response = self._api_get(
+                    f"/api/vcenter/vm/{vm_id}{path}",
+                    throttle_codes=GUEST_THROTTLE_STATUS_CODES if is_guest else THROTTLE_STATUS_CODES,
+                )
+            except Exception as e:
+                logger.warning(f"Error retrieving {field} for {vm_id}: {str(e)}")
+                failed += 1
+                continue
+            if response.status_code == 404 or (is_guest and response.status_code == 503):
+                # Sub-resource not available, e.g. VMware Tools not running
+                continue
+            if not response.ok:
+                logger.warning(f"Failed to retrieve {field} for {vm_id}: {response.status_code}")
+                failed += 1
+                continue
+            data = response.json()
+
+            if field == 'guest_identity':
+                full_name = data.get('full_name', '')
+                if isinstance(full_name, dict):
+                    full_name = full_name.get('default_message', '')
+                guest.update({
+                    'hostname': data.get('host_name', ''),
+                    'ip_address': data.get('ip_address', ''),
+                    'full_name': full_name,
+                })
+                config['guest_id'] = data.get('name', '')
+            elif field == 'guest_networking':
+                dns_values = data.get('dns_values') or {}
+                guest['domain'] = dns_values.get('domain_name', '')
+            elif field == 'tools':
+                guest['tools_status'] = data.get('run_state', '')
+                tools_running = guest['tools_status'] in TOOLS_RUNNING_STATES
+            elif field == 'hardware':
+                config['hardware_version'] = data.get('version', '')
+
+        if requested and failed == requested:
+            return None
+        return {'guest': guest, 'config': config}
+
+    def get_vms_details(self, vms):
+        """
+        Retrieve details for many VMs concurrently.
+
+        Calls to /api/vcenter/vm/{id} (or to its sub-resources with
+        `detail_mode` fields) are fanned out over a thread pool bounded
+        by the account setting `detail_workers`. A failing VM does not stop the
+        run; it is reported in log_details and gets None as result. With a
+        details cache configured, only cache misses are requested.
+
+        Args:
+            vms (list): List of VM data dictionaries from get_vms()
+
+        Returns:
+            list: VM details (or None) in the same order as `vms`
+        """
+        if not vms:
+            return []
+
+        with self.metrics.phase('detail_fetch'):
+            return self._get_vms_details(vms)
+
+    def _get_vms_details(self, vms):
+        """
+        Retrieve details for many VMs, see get_vms_details().
+        """
+        details = [None] * len(vms)
+        if self.details_cache:
+            details = self.details_cache.get_many(vms)
+            misses = details.count(None)
+            logger.info(f"Details cache: {len(vms) - misses} hits, {misses} misses")
+            # Counters end up once per run in log_details, see report_metrics()
+            self.metrics.count('cache_hits', len(vms) - misses)
+            self.metrics.count('cache_misses', misses)
+
+        missing = [index for index, vm_details in enumerate(details) if vm_details is None]
+        if not missing:
+            return details
+
+        # Authenticate once before fanning out, so workers share the session
+        if not self.session_id:
+            if not self.get_session_id():
+                return details
+
+        vm_ids = [vms[index].get('vm') for index in missing]
+        logger.info(f"Fetching details for {len(vm_ids)} VMs using {self.detail_workers} workers")
+
+        with ThreadPoolExecutor(max_workers=self.detail_workers) as executor:
+            # map() keeps the results in the original order
+            fetched = list(executor.map(self._fetch_vm_details, [vms[index] for index in missing]))
+
+        for index, vm_details in zip(missing, fetched):
+            details[index] = vm_details
+
+        if self.limiter.throttled:
+            logger.warning(f"vCenter throttled {self.limiter.throttled} requests, "
+                           f"concurrency now {self.limiter.concurrency}")
+
+        if self.details_cache:
+            self.details_cache.put_many([
+                (vms[index], vm_details) for index, vm_details in zip(missing, fetched)
+                if vm_details is not None
+            ])
+            self.details_cache.evict()
+
+        failed = [vm_id for vm_id, vm_details in zip(vm_ids, fetched) if vm_details is None]
+        for vm_id in failed:
+            self.log_details.append(('detail_error', str(vm_id)))
+        self.metrics.count('detail_errors', len(failed))
+        if failed:
+            logger.warning(f"Failed to retrieve details for {len(failed)} of {len(vm_ids)} VMs")
+
+        return details
+
+    def _fetch_vm_details(self, vm_data):
+        """
+        Worker wrapper around get_vm_details()/get_vm_subresources() that never raises.
+
+        Args:
+            vm_data (dict): VM data from /api/vcenter/vm
+
+        Returns:
+            dict: VM details or None if error
+        """
+        vm_id = vm_data.get('vm')
+        if not vm_id:
+            return None
+        try:
+            if self.detail_mode == 'fields':
+                return self.get_vm_subresources(vm_data)
+            return self.get_vm_details(vm_id)
+        except Exception as e:
+            logger.warning(f"Error retrieving VM details for {vm_id}: {str(e)}")
+            return None
+
+    def _labels_fingerprint(self, labels):
+        """
+        Build a stable hash of the meaningful labels of a VM.
+
+        Args:
+            labels (dict): Labels as written by import_vms
+
+        Returns:
+            str: Hex digest, independent of label order and volatile labels
+        """
+        stable = {k: v for k, v in labels.items() if k not in VOLATILE_LABELS}
+        stable['__account'] = self.config.get('name', '')
+        payload = json.dumps(stable, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _prefetch_hosts(self, hostnames, only=None, exclude=None):
+        """
+        Load all existing hosts for the given hostnames with a single query.
+
+        Args:
+            hostnames (iterable): Hostnames to look up
+            only (tuple): Fields to load, all if None
+            exclude (tuple): Fields not to load
+
+        Returns:
+            dict: Host objects keyed by hostname
+        """
+        hostnames = list(set(hostnames))
+        if not hostnames:
+            return {}
+        query = Host.objects(hostname__in=hostnames)
+        if only:
+            query = query.only(*only)
+        if exclude:
+            query = query.exclude(*exclude)
+        with self.metrics.phase('db_prefetch'):
+            index = {host_obj.hostname: host_obj for host_obj in query}
+        logger.info(f"Prefetched {len(index)} of {len(hostnames)} hosts")
+        return index
+
+    def _flush_last_seen(self, hostnames):
+        """
+        Mark unchanged hosts as seen, with one update query per batch.
+
+        Args:
+            hostnames (list): Hostnames to touch, emptied afterwards
+        """
+        if not hostnames:
+            return
+        now = datetime.now()
+        for start in range(0, len(hostnames), self.write_batch_size):
+            chunk = hostnames[start:start + self.write_batch_size]
+            try:
+                with self.metrics.phase('db_write'):
+                    Host.objects(hostname__in=chunk).update(set__last_import_seen=now)
+            except Exception as e:
+                logger.warning(f"Failed to update last seen for {len(chunk)} hosts: {str(e)}")
+                self.log_details.append(('last_seen_error', str(e)))
+        hostnames.clear()
+
+    def _prepare_base_labels(self, vm_data):
+        """
+        Prepare the labels available from the VM listing.
+
+        Shared by import and inventory, so both describe a VM the same way.
+
+        Args:
+            vm_data (dict): VM data from vCenter
+
+        Returns:
+            dict: Labels, including empty values
+        """
+        return {
+            'vm_id': vm_data.get('vm', ''),
+            'power_state': vm_data.get('power_state', ''),
+            'cpu_count': str(vm_data.get('cpu_count', 0)),
+            'memory_size_gb': str(round(vm_data.get('memory_size_MiB', 0) / 1024, 2)),
+            'memory_size_mib': str(vm_data.get('memory_size_MiB', 0)),
+            'vmware_source': 'vcenter_rest_api',
+            'vcenter_host': self.config['address'],
+        }
+
+    def sync_vms(self, use_bulk=True):
+        """
+        Import and inventorize VMs in a single pass.
+
+        VMs are enumerated and their details fetched only once; import and
+        inventory are both fed from that in-memory data.
+
+        Args:
+            use_bulk (bool): Inventorize with run_inventory (True) or inventorize_host
+        """
+        logger.info("Starting VM sync from vCenter")
 
         vms = self.get_vms()
         if not vms:
             logger.warning("No VMs found")
             return
 
-        created_count = 0
-        updated_count = 0
+        named_vms = [vm_data for vm_data in vms if vm_data.get('name', '').strip()]
+        all_details = self.get_vms_details(named_vms)
+        details_by_id = {
+            vm_data.get('vm'): vm_details for vm_data, vm_details in zip(named_vms, all_details)
+        }
+
+        self.import_vms(vms)
+        self.inventorize_vms(use_bulk=use_bulk, vms=vms, details_by_id=details_by_id)
+
+    def import_vms(self, vms=None):
+        """
+        Import VMs as hosts in CMDBSyncer.
+
+        Improvement #1: Simplified using get_host() directly without checking existence.
+        The method always returns an object (existing or new), and we use set_account's
+        return value to determine if we should save.
+
+        Hosts whose label fingerprint matches the one stored on the last import
+        are not updated nor saved; only their last seen time is refreshed in batches.
+        All other hosts are written through a HostBulkWriter, in chunks of
+        `write_batch_size` documents.
+
+        Args:
+            vms (list): Already enumerated VMs, see sync_vms(). Enumerated if None.
+        """
+        logger.info("Starting VM import from vCenter")
+
         skipped_count = 0
+        unchanged_count = 0
+        vm_count = 0
+        unchanged_hosts = []
+        writer = HostBulkWriter(self.write_batch_size, self.log_details, self.metrics)
+
+        # The VM summaries are small; keeping them allows one host prefetch query
+        if vms is None:
+            vms = self.get_vms()
+        host_index = self._prefetch_hosts(
+            (vm_data.get('name', '').strip() for vm_data in vms),
+            exclude=IMPORT_EXCLUDED_FIELDS,
+        )
 
         for vm_data in vms:
+            vm_count += 1
             hostname = vm_data.get('name', '').strip()
             if not hostname:
                 logger.warning(f"VM without name ignored: {vm_data}")
                 continue
 
             # Prepare VM labels
-            labels = {
-                'vm_id': vm_data.get('vm', ''),
-                'power_state': vm_data.get('power_state', ''),
-                'cpu_count': str(vm_data.get('cpu_count', 0)),
-                'memory_size_gb': str(round(vm_data.get('memory_size_MiB', 0) / 1024, 2)),
-                'memory_size_mib': str(vm_data.get('memory_size_MiB', 0)),
-                'vmware_source': 'vcenter_rest_api',
-                'vcenter_host': self.config['address'],
-                'last_import': str(int(time.time())),
-            }
+            with self.metrics.phase('label_build'):
+                labels = self._prepare_base_labels(vm_data)
+                labels['last_import'] = str(int(time.time()))
 
-            # Remove empty values
-            labels = {k: v for k, v in labels.items() if v}
+                # Remove empty values
+                labels = {k: v for k, v in labels.items() if v}
 
             logger.info(f"Processing VM: {hostname}")
 
             # Improvement #1: get_host always returns an object (existing or new)
-            # No need to check existence first
-            host_obj = Host.get_host(hostname)
+            # No need to check existence first. Existing hosts come from the
+            # prefetch index, so get_host is only reached for new hosts.
+            host_obj = host_index.get(hostname)
+            if not host_obj:
+                host_obj = Host.get_host(hostname)
+                # VMs with the same name in other datacenters update this host
+                host_index[hostname] = host_obj
 
             # Track if this is a new host (before update_host)
             is_new = not host_obj.id
 
+            fingerprint = self._labels_fingerprint(labels)
+            if not is_new and host_obj.cache.get(FINGERPRINT_KEY) == fingerprint:
+                unchanged_count += 1
+                unchanged_hosts.append(hostname)
+                if len(unchanged_hosts) >= self.write_batch_size:
+                    self._flush_last_seen(unchanged_hosts)
+                continue
+
             # Update host with VM data
             host_obj.update_host(labels)
 
@@ -202,20 +1351,27 @@ class VMwareRestApiPlugin(Plugin):
             do_save = host_obj.set_account(account_dict=self.config)
 
             if do_save:
-                host_obj.save()
-                if is_new:
-                    created_count += 1
-                    logger.info(f"Host {hostname} created")
-                else:
-                    updated_count += 1
-                    logger.info(f"Host {hostname} updated")
+                # Only hosts we save get the fingerprint, others are left alone
+                host_obj.cache[FINGERPRINT_KEY] = fingerprint
+                writer.add(host_obj)
+                logger.debug(f"Host {hostname} queued for {'creation' if is_new else 'update'}")
             else:
                 skipped_count += 1
                 logger.debug(f"Host {hostname} didn't need update")
 
-        logger.info(f"Import completed: {created_count} created, {updated_count} updated, {skipped_count} skipped")
+        writer.flush()
+        self._flush_last_seen(unchanged_hosts)
+
+        if not vm_count:
+            logger.warning("No VMs found")
+            return
+
+        logger.info(f"Import completed: {writer.created} created, {writer.updated} updated, "
+                    f"{unchanged_count} unchanged, {skipped_count} skipped, "
+                    f"{writer.written} written, {writer.failed} failed")
+        self.log_details.append(('unchanged', str(unchanged_count)))
 
-    def inventorize_vms(self, use_bulk=True):
+    def inventorize_vms(self, use_bulk=True, vms=None, details_by_id=None):
         """
         Inventorize existing VMs with detailed data.
 
@@ -225,49 +1381,104 @@ class VMwareRestApiPlugin(Plugin):
         Args:
             use_bulk (bool): If True, use run_inventory (bulk). If False, use inventorize_host
                            (one by one) for better performance in some scenarios.
+            vms (list): Already enumerated VMs, see sync_vms(). Enumerated if None.
+            details_by_id (dict): Already fetched VM details by VM id. Fetched if None.
         """
         logger.info("Starting VM inventorization from vCenter")
 
-        vms = self.get_vms()
+        if vms is None and use_bulk and self.stream_listing:
+            self._inventorize_stream(self.iter_vms())
+            return
+
+        if vms is None:
+            vms = self.get_vms()
         if not vms:
             logger.warning("No VMs found")
             return
 
         if use_bulk:
             # Default method: use run_inventory for bulk operations
-            self._inventorize_bulk(vms)
+            self._inventorize_bulk(vms, details_by_id)
         else:
             # Alternative method: use inventorize_host for one-by-one processing
             # Better for performance in some scenarios
-            self._inventorize_individual(vms)
+            self._inventorize_individual(vms, details_by_id)
+
+    def _lookup_details(self, vms, details_by_id=None):
+        """
+        Return VM details in the order of `vms`, fetching them if not given.
+
+        Args:
+            vms (list): List of VM data from vCenter
+            details_by_id (dict): Already fetched VM details by VM id
+
+        Returns:
+            list: VM details (or None) in the same order as `vms`
+        """
+        if details_by_id is None:
+            return self.get_vms_details(vms)
+        return [details_by_id.get(vm_data.get('vm')) for vm_data in vms]
 
-    def _inventorize_bulk(self, vms):
+    def _inventorize_bulk(self, vms, details_by_id=None):
         """
         Inventorize using run_inventory (bulk operation).
 
         Args:
             vms (list): List of VM data from vCenter
+            details_by_id (dict): Already fetched VM details by VM id
         """
         # Prepare data for inventorization
         processed_objects = []
 
-        for vm_data in vms:
-            hostname = vm_data.get('name', '').strip()
-            if not hostname:
-                continue
+        vms = [vm_data for vm_data in vms if vm_data.get('name', '').strip()]
+        all_details = self._lookup_details(vms, details_by_id)
+
+        for vm_data, vm_details in zip(vms, all_details):
+            hostname = vm_data['name'].strip()
 
             # Prepare VM labels with detailed information
-            labels = self._prepare_inventory_labels(vm_data)
+            with self.metrics.phase('label_build'):
+                labels = self._prepare_inventory_labels(vm_data, vm_details)
             processed_objects.append((hostname, labels))
 
         if processed_objects:
             logger.info(f"Inventorizing {len(processed_objects)} VMs using bulk method")
             # Use run_inventory for bulk inventorization
-            run_inventory(self.config, processed_objects)
+            with self.metrics.phase('inventory'):
+                run_inventory(self.config, processed_objects)
         else:
             logger.warning("No valid VMs to inventorize")
 
-    def _inventorize_individual(self, vms):
+    def _inventorize_stream(self, vm_iter):
+        """
+        Inventorize with run_inventory in chunks, while the listing streams in.
+
+        Only `inventory_chunk_size` VMs with their details and labels are in
+        memory at any time, and inventory writes start with the first chunk.
+
+        Args:
+            vm_iter (iterator): VM data from vCenter, see iter_vms()
+        """
+        named_vms = (vm_data for vm_data in vm_iter if vm_data.get('name', '').strip())
+        total = 0
+        while chunk := list(islice(named_vms, self.inventory_chunk_size)):
+            all_details = self.get_vms_details(chunk)
+            with self.metrics.phase('label_build'):
+                processed_objects = [
+                    (vm_data['name'].strip(), self._prepare_inventory_labels(vm_data, vm_details))
+                    for vm_data, vm_details in zip(chunk, all_details)
+                ]
+            with self.metrics.phase('inventory'):
+                run_inventory(self.config, processed_objects)
+            total += len(processed_objects)
+            logger.info(f"Inventorized {total} VMs so far...")
+
+        if total:
+            logger.info(f"Inventorization completed: {total} VMs using streaming method")
+        else:
+            logger.warning("No valid VMs to inventorize")
+
+    def _inventorize_individual(self, vms, details_by_id=None):
         """
         Inventorize using inventorize_host (one by one).
 
@@ -275,26 +1486,40 @@ class VMwareRestApiPlugin(Plugin):
 
         Args:
             vms (list): List of VM data from vCenter
+            details_by_id (dict): Already fetched VM details by VM id
         """
         inventorize_key = self.config.get('inventorize_key', 'vmware_vcenter')
         updated_count = 0
 
+        host_index = self._prefetch_hosts(
+            (vm_data.get('name', '').strip() for vm_data in vms),
+            only=INVENTORY_FIELDS,
+        )
+
+        existing = []
         for vm_data in vms:
             hostname = vm_data.get('name', '').strip()
             if not hostname:
                 continue
 
             # Get existing host
-            host_obj = Host.get_host(hostname, create=False)
+            host_obj = host_index.get(hostname)
             if not host_obj:
                 logger.debug(f"Host {hostname} not found, skipping inventorization")
                 continue
+            existing.append((host_obj, vm_data))
+
+        # Only fetch details for VMs that have a host to inventorize
+        all_details = self._lookup_details([vm_data for _, vm_data in existing], details_by_id)
 
+        for (host_obj, vm_data), vm_details in zip(existing, all_details):
             # Prepare inventory labels
-            labels = self._prepare_inventory_labels(vm_data)
+            with self.metrics.phase('label_build'):
+                labels = self._prepare_inventory_labels(vm_data, vm_details)
 
             # Use inventorize_host for individual processing
-            inventorize_host(host_obj, labels, inventorize_key, self.config)
+            with self.metrics.phase('inventory'):
+                inventorize_host(host_obj, labels, inventorize_key, self.config)
             updated_count += 1
 
             if updated_count % 100 == 0:
@@ -302,29 +1527,21 @@ class VMwareRestApiPlugin(Plugin):
 
         logger.info(f"Inventorization completed: {updated_count} hosts updated using individual method")
 
-    def _prepare_inventory_labels(self, vm_data):
+    def _prepare_inventory_labels(self, vm_data, vm_details=None):
         """
         Prepare inventory labels with VM details.
 
         Args:
             vm_data (dict): VM data from vCenter
+            vm_details (dict): Prefetched VM details, see get_vms_details()
 
         Returns:
             dict: Labels for inventory
         """
-        labels = {
-            'vm_id': vm_data.get('vm', ''),
-            'power_state': vm_data.get('power_state', ''),
-            'cpu_count': str(vm_data.get('cpu_count', 0)),
-            'memory_size_gb': str(round(vm_data.get('memory_size_MiB', 0) / 1024, 2)),
-            'memory_size_mib': str(vm_data.get('memory_size_MiB', 0)),
-            'vmware_source': 'vcenter_rest_api',
-            'vcenter_host': self.config['address'],
-            'last_inventory': str(int(time.time())),
-        }
+        labels = self._prepare_base_labels(vm_data)
+        labels['last_inventory'] = str(int(time.time()))
 
-        # Retrieve additional VM details if possible
-        vm_details = self.get_vm_details(vm_data.get('vm'))
+        # Additional VM details, if they could be retrieved
         if vm_details:
             guest_info = vm_details.get('guest', {})
             config_info = vm_details.get('config', {})
@@ -335,6 +1552,7 @@ class VMwareRestApiPlugin(Plugin):
                     'guest_ip': guest_info.get('ip_address', ''),
                     'guest_os': guest_info.get('full_name', ''),
                     'tools_status': guest_info.get('tools_status', ''),
+                    'guest_domain': guest_info.get('domain', ''),
                 })
 
             if config_info:
@@ -342,11 +1560,28 @@ class VMwareRestApiPlugin(Plugin):
                     'vm_uuid': config_info.get('uuid', ''),
                     'guest_id': config_info.get('guest_id', ''),
                     'annotation': config_info.get('annotation', ''),
+                    'hardware_version': config_info.get('hardware_version', ''),
                 })
 
         # Remove empty values
         return {k: v for k, v in labels.items() if v}
 
+    def report_metrics(self):
+        """
+        Publish the run metrics to log_details and the optional metrics file.
+
+        The account setting `metrics_file` selects the file; a .prom suffix
+        writes the Prometheus textfile format, anything else JSON.
+        """
+        phases = ', '.join(f"{name} {value:.1f}s" for name, value in self.metrics.phases.items())
+        logger.info(f"Timing: {phases}")
+        self.metrics.to_log_details(self.log_details)
+        if metrics_file := self.config.get('metrics_file'):
+            try:
+                self.metrics.write(metrics_file, self.config.get('name', self.config['address']))
+            except OSError as e:
+                logger.warning(f"Failed to write metrics file {metrics_file}: {str(e)}")
+
 
 @cli.group(name='vmware_rest')
 def cli_vmware_rest():
@@ -361,15 +1596,22 @@ def vmware_rest_import(account, debug=False):
         account (str): Account name configured in CMDBSyncer
         debug (bool): Enable debug mode
     """
+    plugin = None
     try:
         plugin = VMwareRestApiPlugin(account)
         plugin.name = f"Import VMs from {account}"
         plugin.source = "vmware_rest_import"
         plugin.import_vms()
+        if plugin.error:
+            raise RuntimeError(plugin.error)
     except Exception as e:
         logger.error(f"Import error: {str(e)}")
         if debug:
             raise
+    finally:
+        # Failed runs need their timing and error counts the most
+        if plugin:
+            plugin.report_metrics()
 
 
 def vmware_rest_inventorize(account, debug=False, use_individual=False):
@@ -381,16 +1623,137 @@ def vmware_rest_inventorize(account, debug=False, use_individual=False):
         debug (bool): Enable debug mode
         use_individual (bool): Use individual inventorize_host instead of bulk (for performance)
     """
+    plugin = None
     try:
         plugin = VMwareRestApiPlugin(account)
         plugin.name = f"Inventorize VMs from {account}"
         plugin.source = "vmware_rest_inventorize"
         # Use bulk by default, individual if flag is set
         plugin.inventorize_vms(use_bulk=not use_individual)
+        if plugin.error:
+            raise RuntimeError(plugin.error)
     except Exception as e:
         logger.error(f"Inventorization error: {str(e)}")
         if debug:
             raise
+    finally:
+        # Failed runs need their timing and error counts the most
+        if plugin:
+            plugin.report_metrics()
+
+
+def vmware_rest_sync(account, debug=False, use_individual=False):
+    """
+    Import and inventorize VMs in a single pass
+
+    Args:
+        account (str): Account name configured in CMDBSyncer
+        debug (bool): Enable debug mode
+        use_individual (bool): Use individual inventorize_host instead of bulk (for performance)
+    """
+    plugin = None
+    try:
+        plugin = VMwareRestApiPlugin(account)
+        plugin.name = f"Sync VMs from {account}"
+        plugin.source = "vmware_rest_sync"
+        plugin.sync_vms(use_bulk=not use_individual)
+        if plugin.error:
+            raise RuntimeError(plugin.error)
+    except Exception as e:
+        logger.error(f"Sync error: {str(e)}")
+        if debug:
+            raise
+    finally:
+        # Failed runs need their timing and error counts the most
+        if plugin:
+            plugin.report_metrics()
+
+
+def resolve_accounts(patterns, account_type='vmware_vcenter'):
+    """
+    Expand account names and shell patterns to enabled account names.
+
+    Args:
+        patterns (list): Account names or patterns like "vcenter-*"
+        account_type (str): Account type the patterns are matched against
+
+    Returns:
+        list: Account names, in the order given, without duplicates
+    """
+    # syncerapi has no account listing, so patterns need the model itself
+    from application.models.account import Account  # pylint: disable=import-outside-toplevel
+
+    known = None
+    accounts = []
+    for pattern in patterns:
+        if not any(char in pattern for char in '*?['):
+            matches = [pattern]
+        else:
+            if known is None:
+                known = [acc.name for acc in Account.objects(enabled=True, type=account_type)]
+            matches = fnmatch.filter(known, pattern)
+        accounts.extend(name for name in matches if name not in accounts)
+    return accounts
+
+
+def _run_account_job(job, account):
+    """
+    Run one job for one account, in a worker process.
+
+    The job runs in debug mode so its errors reach us instead of being
+    swallowed, and are returned instead of raised to isolate the account.
+    Failed logins and VM listings count as errors, see record_error().
+
+    resolve_accounts(), _run_account_job() and run_accounts() mirror the
+    ones of the pyVmomi vmware plugin. The plugins are installed
+    independently and cannot import each other, so keep both in sync.
+
+    Returns:
+        tuple: (account, error or None, duration in seconds)
+    """
+    start = time.time()
+    try:
+        ACCOUNT_JOBS[job](account, debug=True)
+        return account, None, time.time() - start
+    except Exception as e:
+        return account, str(e), time.time() - start
+
+
+def run_accounts(job, accounts, max_workers=4):
+    """
+    Run a job for many accounts in parallel worker processes.
+
+    Args:
+        job (str): Key of ACCOUNT_JOBS
+        accounts (list): Account names
+        max_workers (int): Global cap of accounts running at the same time
+
+    Returns:
+        list: (account, error or None, duration) per account
+    """
+    results = []
+    # spawn instead of fork, every worker opens its own database connection
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        futures = {
+            executor.submit(_run_account_job, job, account): account for account in accounts
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died
+                result = (futures[future], str(e), 0)
+            logger.info(f"{job} {result[0]}: {'failed' if result[1] else 'ok'} "
+                        f"in {result[2]:.1f}s")
+            results.append(result)
+
+    failed = [result for result in results if result[1]]
+    logger.info(f"{job} finished for {len(results)} accounts: "
+                f"{len(results) - len(failed)} ok, {len(failed)} failed")
+    for account, error, _ in failed:
+        logger.error(f"{job} {account}: {error}")
+    return sorted(results)
 
 
 @cli_vmware_rest.command('import_vms')
@@ -410,6 +1773,36 @@ def cli_vmware_rest_inventorize(account, debug, individual):
     vmware_rest_inventorize(account, debug, use_individual=individual)
 
 
+@cli_vmware_rest.command('sync')
+@click.option("--debug", is_flag=True, help="Enable debug mode")
+@click.option("--individual", is_flag=True, help="Use individual processing for better performance")
+@click.argument('account')
+def cli_vmware_rest_sync(account, debug, individual):
+    """Import and inventorize VMs, fetching vCenter only once"""
+    vmware_rest_sync(account, debug, use_individual=individual)
+
+
+@cli_vmware_rest.command('run_accounts')
+@click.option("--workers", default=4, show_default=True,
+              help="Maximum number of accounts processed at the same time")
+@click.argument('job', type=click.Choice(['import', 'inventorize', 'sync']))
+@click.argument('accounts', nargs=-1, required=True)
+def cli_vmware_rest_run_accounts(job, accounts, workers):
+    """Run a job for many accounts (names or patterns like "vc-*") in parallel"""
+    results = run_accounts(job, resolve_accounts(accounts), max_workers=workers)
+    print(f"{'Account':<30} {'Status':<8} {'Seconds':>8}  Error")
+    for account, error, duration in results:
+        print(f"{account:<30} {'failed' if error else 'ok':<8} {duration:>8.1f}  {error or ''}")
+
+
+# Jobs available for run_accounts
+ACCOUNT_JOBS = {
+    'import': vmware_rest_import,
+    'inventorize': vmware_rest_inventorize,
+    'sync': vmware_rest_sync,
+}
+
 # Register cron jobs
 register_cronjob("VMware REST: Import VMs", vmware_rest_import)
 register_cronjob("VMware REST: Inventorize VMs", vmware_rest_inventorize)
+register_cronjob("VMware REST: Sync VMs", vmware_rest_sync)
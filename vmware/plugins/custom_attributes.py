@@ -2,11 +2,24 @@
 """Sync VMware Vsphere Custom Attributes - VERSÃO APRIMORADA"""
 #pylint: disable=logging-fstring-interpolation
 
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from itertools import islice
+
 import requests
 from rich.progress import Progress, SpinnerColumn, TimeElapsedColumn, MofNCompleteColumn
 
 try:
-    from pyVmomi import vim
+    from pyVmomi import vim, vmodl
+    from pyVim.connect import SmartConnect, Disconnect
 except ImportError:
     pass
 
@@ -23,6 +36,278 @@ from application import app
 from application.modules.vmware.vmware import VMWareVcenterPlugin
 
 
+# Propriedades de VM lidas em lote pelo PropertyCollector
+VM_PROPERTIES = (
+    'name',
+    'parent',
+    'guest.ipAddress',
+    'guest.hostName',
+    'guest.guestFullName',
+    'guest.toolsStatus',
+    'summary.config.guestFullName',
+    'summary.config.uuid',
+    'summary.config.guestId',
+    'summary.config.annotation',
+    'summary.config.template',
+    'summary.config.vmPathName',
+    'summary.config.instanceUuid',
+    'config.hardware.numCPU',
+    'config.hardware.memoryMB',
+    'runtime.powerState',
+    'runtime.host',
+    'runtime.bootTime',
+    'network',
+    'datastore',
+    'customValue',
+)
+
+# Propriedades de hosts ESXi, datastores e redes, compartilhados entre VMs
+ENTITY_PROPERTIES = {
+    'host': ('name', 'summary.config.product.version'),
+    'datastore': ('name', 'summary.type'),
+    'network': ('name',),
+}
+
+# Tags por chamada de list-attached-objects-on-tags
+TAG_BATCH_SIZE = 500
+
+
+class AccountSettings:
+    """
+    Custom fields da conta já convertidos para os tipos esperados
+    Montado uma vez por execução; campos ausentes usam os padrões abaixo
+    """
+    collect_tags = False
+    include_templates = False
+    max_folder_depth = 9
+    property_page_size = 1000
+    collect_scope = None
+    collect_workers = 1
+    export_workers = 8
+    inventory_chunk_size = 500
+    rule_cache_path = None
+    metrics_file = None
+    incremental_state_file = None
+
+    # Tamanhos e contagens: 0 ou negativo viraria laço vazio ou erro
+    POSITIVE_SETTINGS = ('property_page_size', 'collect_workers', 'export_workers',
+                         'inventory_chunk_size')
+
+    def __init__(self, custom_fields):
+        self.values = {}
+        for field in custom_fields or []:
+            if field.get('name') and 'value' in field:
+                self.values[field['name']] = self.convert(field['value'])
+
+        # Atributos tipados, com o tipo do valor padrão
+        for name, value in self.values.items():
+            default = getattr(type(self), name, None)
+            if isinstance(default, bool):
+                setattr(self, name, bool(value))
+            elif isinstance(default, int):
+                try:
+                    value = int(value)
+                    if name in self.POSITIVE_SETTINGS:
+                        value = max(1, value)
+                    setattr(self, name, value)
+                except (TypeError, ValueError):
+                    logger.warning(f"Valor inválido para {name}: {value}")
+            elif name in vars(type(self)):
+                setattr(self, name, value)
+
+    @staticmethod
+    def convert(value):
+        """
+        Converter string para tipos apropriados
+        """
+        if isinstance(value, str):
+            if value.lower() in ('true', '1', 'yes', 'on'):
+                return True
+            if value.lower() in ('false', '0', 'no', 'off'):
+                return False
+            if value.isdigit():
+                return int(value)
+        return value
+
+    def get(self, setting_name, default_value=None):
+        """
+        Valor de qualquer custom field, já convertido
+        """
+        return self.values.get(setting_name, default_value)
+
+
+class RuleResultCache:
+    """
+    Cache persistente (sqlite) do resultado das regras por host
+    A entrada só vale enquanto o fingerprint for o mesmo: hash dos atributos
+    do host (labels e inventory) e da versão do conjunto de regras ativas,
+    então qualquer mudança em regras ou no host invalida o resultado
+    """
+
+    def __init__(self, path):
+        self.hits = 0
+        self.misses = 0
+        self.pending = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS rule_results ("
+            " hostname TEXT PRIMARY KEY, fingerprint TEXT, result TEXT)"
+        )
+        self.db.commit()
+
+    @staticmethod
+    def fingerprint(db_host, rule_version):
+        """
+        Hash dos atributos do host junto com a versão das regras
+        """
+        data = json.dumps({
+            'hostname': db_host.hostname,
+            'labels': getattr(db_host, 'labels', None) or {},
+            'inventory': getattr(db_host, 'inventory', None) or {},
+            'rules': rule_version,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def get(self, hostname, fingerprint):
+        """
+        Retorna (encontrado, resultado das regras)
+        """
+        row = self.db.execute(
+            "SELECT fingerprint, result FROM rule_results WHERE hostname = ?", (hostname,)
+        ).fetchone()
+        if row and row[0] == fingerprint:
+            self.hits += 1
+            return True, json.loads(row[1])
+        self.misses += 1
+        return False, None
+
+    def put(self, hostname, fingerprint, result):
+        """
+        Guardar um resultado; gravado em disco no flush()
+        """
+        self.pending.append((hostname, fingerprint, json.dumps(result, default=str)))
+
+    def flush(self):
+        """
+        Gravar os resultados pendentes em uma transação
+        """
+        if self.pending:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO rule_results (hostname, fingerprint, result) "
+                "VALUES (?, ?, ?)", self.pending
+            )
+            self.db.commit()
+            self.pending = []
+
+
+class RunMetrics:
+    """
+    Métricas de tempo e de chamadas à API de uma execução
+    Tempo por fase (fases podem ser aninhadas), contagem e histograma de
+    latência por operação, e contadores livres (erros, retries)
+    """
+
+    # Limites superiores em segundos dos buckets do histograma
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.phases = {}
+        self.operations = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Medir o tempo de um bloco; blocos repetidos são somados
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + time.monotonic() - start
+
+    def count(self, name, value=1):
+        """
+        Incrementar um contador
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, operation, latency, error=False):
+        """
+        Registrar uma chamada (operação SOAP ou endpoint REST)
+        """
+        with self._lock:
+            stats = self.operations.setdefault(operation, {
+                'count': 0, 'errors': 0, 'sum': 0.0, 'buckets': [0] * len(self.BUCKETS),
+            })
+            stats['count'] += 1
+            stats['sum'] += latency
+            if error:
+                stats['errors'] += 1
+            for index, bound in enumerate(self.BUCKETS):
+                if latency <= bound:
+                    stats['buckets'][index] += 1
+
+    def to_log_details(self, log_details):
+        """
+        Adicionar um resumo legível ao log_details do plugin
+        """
+        for name, value in self.phases.items():
+            log_details.append((f'time_{name}', f"{value:.2f}s"))
+        for operation, stats in self.operations.items():
+            average = stats['sum'] / stats['count'] if stats['count'] else 0
+            log_details.append((f'calls {operation}',
+                                f"{stats['count']} ({stats['errors']} errors, "
+                                f"avg {average * 1000:.0f}ms)"))
+        for name, value in self.counters.items():
+            log_details.append((name, str(value)))
+
+    def write(self, path, account):
+        """
+        Gravar as métricas em arquivo (.prom = formato textfile do Prometheus,
+        qualquer outro = JSON), substituindo o arquivo de forma atômica
+        """
+        if path.endswith('.prom'):
+            lines = ['# TYPE vmware_phase_seconds gauge']
+            for name, value in self.phases.items():
+                lines.append(f'vmware_phase_seconds{{account="{account}",phase="{name}"}} {value:.3f}')
+            lines.append('# TYPE vmware_call_seconds histogram')
+            for operation, stats in self.operations.items():
+                labels = f'account="{account}",operation="{operation}"'
+                for bound, bucket in zip(self.BUCKETS, stats['buckets']):
+                    lines.append(f'vmware_call_seconds_bucket{{{labels},le="{bound}"}} {bucket}')
+                lines.append(f'vmware_call_seconds_bucket{{{labels},le="+Inf"}} {stats["count"]}')
+                lines.append(f'vmware_call_seconds_sum{{{labels}}} {stats["sum"]:.3f}')
+                lines.append(f'vmware_call_seconds_count{{{labels}}} {stats["count"]}')
+            lines.append('# TYPE vmware_call_errors_total counter')
+            for operation, stats in self.operations.items():
+                lines.append(f'vmware_call_errors_total{{account="{account}",'
+                             f'operation="{operation}"}} {stats["errors"]}')
+            lines.append('# TYPE vmware_events_total counter')
+            for name, value in self.counters.items():
+                lines.append(f'vmware_events_total{{account="{account}",event="{name}"}} {value}')
+            content = "\n".join(lines) + "\n"
+        else:
+            content = json.dumps({
+                'account': account,
+                'timestamp': int(time.time()),
+                'phases': {name: round(value, 3) for name, value in self.phases.items()},
+                'operations': self.operations,
+                'counters': self.counters,
+                'buckets': list(self.BUCKETS),
+            }, indent=2)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as metrics_file:
+            metrics_file.write(content)
+        os.replace(tmp_path, path)
+
+
 class VMwareCustomAttributesPlugin(VMWareVcenterPlugin):
     """
     VMware Custom Attributes - VERSÃO APRIMORADA
@@ -30,205 +315,397 @@ class VMwareCustomAttributesPlugin(VMWareVcenterPlugin):
     """
     console = None
     container_view = None
+    vm_objects = None
+    tag_index = None
+    folder_tree = None
+    folder_paths = None
+    entity_caches = None
+    account_settings = None
+    custom_field_names = None
+    rule_cache = None
+    rule_version = None
+    worker_local = None
+    worker_instances = None
+    metrics = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = RunMetrics()
+
+    def report_metrics(self):
+        """
+        Publicar as métricas da execução no log_details e, se configurado
+        via custom field metrics_file, em arquivo JSON ou Prometheus (.prom)
+        """
+        phases = ', '.join(f"{name} {value:.1f}s" for name, value in self.metrics.phases.items())
+        logger.info(f"Timing: {phases}")
+        self.metrics.to_log_details(self.log_details)
+        if metrics_file := self.get_account_settings().metrics_file:
+            try:
+                self.metrics.write(metrics_file, self.config.get('name', self.config['address']))
+            except OSError as e:
+                logger.warning(f"Erro ao gravar arquivo de métricas {metrics_file}: {e}")
+
+    def connect(self):
+        """
+        Conectar e preparar o contexto da execução: configurações tipadas e
+        mapa chave -> nome dos custom fields, para que o caminho por VM
+        não faça leituras remotas nem buscas lineares
+        """
+        super().connect()
+        self.prepare_run_context()
+
+    def prepare_run_context(self):
+        """
+        Montar configurações tipadas e mapa de custom fields da conexão atual
+        """
+        self.account_settings = AccountSettings(self.config.get('custom_fields', []))
+        content = self.vcenter.RetrieveContent()
+        self.custom_field_names = {
+            field.key: field.name for field in content.customFieldsManager.field or []
+        }
+
+    def get_account_settings(self):
+        """
+        Configurações tipadas da conta, montadas se connect() ainda não rodou
+        """
+        if self.account_settings is None:
+            self.account_settings = AccountSettings(self.config.get('custom_fields', []))
+        return self.account_settings
 
     def get_custom_setting(self, setting_name, default_value=None):
         """
         Obter configuração customizada da conta via custom_fields
         """
-        custom_fields = self.config.get('custom_fields', [])
-
-        # Procurar pela configuração nos custom_fields
-        for field in custom_fields:
-            if field.get('name') == setting_name:
-                value = field.get('value', default_value)
-                # Converter string para tipos apropriados
-                if isinstance(value, str):
-                    if value.lower() in ('true', '1', 'yes', 'on'):
-                        return True
-                    elif value.lower() in ('false', '0', 'no', 'off'):
-                        return False
-                    elif value.isdigit():
-                        return int(value)
-                return value
+        return self.get_account_settings().get(setting_name, default_value)
 
-        return default_value
+    def _tag_request(self, session, method, url, operation, **kwargs):
+        """
+        Chamada à API REST de tagging com registro de latência nas métricas
+        """
+        start = time.monotonic()
+        response = session.request(method, url, **kwargs)
+        self.metrics.observe(operation, time.monotonic() - start,
+                             error=response.status_code != 200)
+        return response
 
-    def get_vm_tags(self, vm_id):
+    def build_tag_index(self):
         """
-        Coletar tags VMware usando REST API
+        Montar uma vez por execução o índice VM (moref) -> tags
+        Detalhes de tags e categorias são lidos uma vez cada, e as associações
+        em lote via list-attached-objects-on-tags
         """
+        self.tag_index = {}
+        cis_url = f'https://{self.config["address"]}/rest/com/vmware/cis'
         try:
-            base_url = f'https://{self.config["address"]}'
-            cis_url = f'{base_url}/rest/com/vmware/cis'
-
             with requests.Session() as session:
                 session.auth = (self.config['username'], self.config['password'])
                 session.verify = False
 
                 # Autenticar na API REST
-                token_response = session.post(f'{cis_url}/session')
-                if token_response.status_code == 200:
-                    # Coletar todas as tags
-                    tags_response = session.get(f'{cis_url}/tagging/tag')
-                    if tags_response.status_code == 200:
-                        tags_data = tags_response.json()
-                        vm_tags = []
-
-                        for tag_id in tags_data.get('value', []):
-                            # Verificar se a tag está associada à VM
-                            associations_response = session.post(
-                                f'{cis_url}/tagging/tag-association/id:{tag_id}?~action=list-attached-objects'
-                            )
-                            if associations_response.status_code == 200:
-                                associations = associations_response.json().get('value', [])
-                                for association in associations:
-                                    if association.get('id') == vm_id:
-                                        # Obter detalhes da tag
-                                        tag_details = session.get(f'{cis_url}/tagging/tag/id:{tag_id}')
-                                        if tag_details.status_code == 200:
-                                            tag_info = tag_details.json().get('value', {})
-                                            vm_tags.append({
-                                                'name': tag_info.get('name', ''),
-                                                'description': tag_info.get('description', '')
-                                            })
-                        return vm_tags
+                response = self._tag_request(session, 'POST', f'{cis_url}/session', 'cis/session')
+                if response.status_code != 200:
+                    logger.warning(f"Falha ao autenticar na API de tags: {response.status_code}")
+                    return self.tag_index
+
+                response = self._tag_request(session, 'GET', f'{cis_url}/tagging/tag',
+                                             'cis/tagging/tag')
+                if response.status_code != 200:
+                    return self.tag_index
+                tag_ids = response.json().get('value', [])
+
+                # Detalhes de cada tag e de sua categoria
+                tags = {}
+                categories = {}
+                for tag_id in tag_ids:
+                    response = self._tag_request(session, 'GET', f'{cis_url}/tagging/tag/id:{tag_id}',
+                                                 'cis/tagging/tag/id')
+                    if response.status_code != 200:
+                        continue
+                    tag_info = response.json().get('value', {})
+                    category_id = tag_info.get('category_id')
+                    if category_id and category_id not in categories:
+                        categories[category_id] = ''
+                        response = self._tag_request(session, 'GET',
+                                                     f'{cis_url}/tagging/category/id:{category_id}',
+                                                     'cis/tagging/category/id')
+                        if response.status_code == 200:
+                            categories[category_id] = response.json().get('value', {}).get('name', '')
+                    tags[tag_id] = {
+                        'name': tag_info.get('name', ''),
+                        'description': tag_info.get('description', ''),
+                        'category': categories.get(category_id, ''),
+                    }
+
+                # Associações de várias tags por chamada
+                tag_ids = list(tags)
+                for index in range(0, len(tag_ids), TAG_BATCH_SIZE):
+                    response = self._tag_request(
+                        session, 'POST',
+                        f'{cis_url}/tagging/tag-association?~action=list-attached-objects-on-tags',
+                        'cis/tagging/tag-association',
+                        json={'tag_ids': tag_ids[index:index + TAG_BATCH_SIZE]},
+                    )
+                    if response.status_code != 200:
+                        continue
+                    for association in response.json().get('value', []):
+                        tag = tags.get(association.get('tag_id'))
+                        for attached in association.get('object_ids', []):
+                            if tag and attached.get('type') == 'VirtualMachine':
+                                self.tag_index.setdefault(attached.get('id'), []).append(tag)
         except Exception as e:
-            logger.debug(f"Erro ao coletar tags para VM {vm_id}: {e}")
-        return []
+            self.metrics.count('tag_errors')
+            logger.warning(f"Erro ao montar índice de tags: {e}")
+        logger.debug(f"Índice de tags com {len(self.tag_index)} VMs")
+        return self.tag_index
 
-    def get_vm_folder_hierarchy(self, vm, max_depth=None):
+    def get_vm_tags(self, vm_id):
+        """
+        Tags VMware da VM (moref, ex: vm-123) pelo índice da execução
+        """
+        if self.tag_index is None:
+            self.build_tag_index()
+        return self.tag_index.get(vm_id, [])
+
+    def build_folder_tree(self, content):
+        """
+        Ler nome e parent de todos os Folders e Datacenters em lote,
+        uma vez por execução, indexados por moref
+        """
+        self.folder_tree = {}
+        self.folder_paths = {}
+        for obj_type in (vim.Folder, vim.Datacenter):
+            for obj, props in self.retrieve_properties(content, obj_type, ('name', 'parent')):
+                self.folder_tree[obj._moId] = (props.get('name'), props.get('parent'))
+        # O rootFolder não faz parte da container view
+        root = content.rootFolder
+        self.folder_tree.setdefault(root._moId, (root.name, None))
+        logger.debug(f"Árvore de folders com {len(self.folder_tree)} objetos")
+
+    def get_folder_path(self, folder):
+        """
+        Caminho completo (tupla de nomes, da raiz ao folder) memoizado por moref
+        """
+        chain = []
+        path = ()
+        current = folder
+        while current is not None:
+            moref = current._moId
+            if moref in self.folder_paths:
+                path = self.folder_paths[moref]
+                break
+            if moref not in self.folder_tree:
+                break
+            name, current = self.folder_tree[moref]
+            chain.append((moref, name))
+        for moref, name in reversed(chain):
+            path = path + (name,)
+            self.folder_paths[moref] = path
+        return path
+
+    def build_entity_caches(self, content):
+        """
+        Ler em lote, uma vez por execução, nome e dados principais de todos
+        os hosts ESXi, datastores e redes, indexados por moref
+        """
+        self.entity_caches = {}
+        for kind, obj_type in (('host', vim.HostSystem),
+                               ('datastore', vim.Datastore),
+                               ('network', vim.Network)):
+            cache = self.entity_caches[kind] = {}
+            for obj, props in self.retrieve_properties(content, obj_type, ENTITY_PROPERTIES[kind]):
+                cache[obj._moId] = props
+        summary = ", ".join(f"{len(cache)} {kind}" for kind, cache in self.entity_caches.items())
+        logger.debug(f"Cache de objetos: {summary}")
+
+    def get_entity(self, kind, obj):
+        """
+        Dados de um host ESXi, datastore ou rede pelo moref
+        Objetos ausentes do cache (criados após a carga) são lidos uma vez
+        """
+        if obj is None:
+            return {}
+        if self.entity_caches is None:
+            self.build_entity_caches(self.vcenter.RetrieveContent())
+        cache = self.entity_caches.setdefault(kind, {})
+        moref = obj._moId
+        if moref not in cache:
+            cache[moref] = {'name': obj.name}
+        return cache[moref]
+
+    def get_vm_folder_hierarchy(self, vm, max_depth=None, parent=None):
         """
         Coletar hierarquia completa de folders da VM
+        Resolvida pela árvore de folders da execução; parent é o moref do
+        folder da VM, se já lido
         """
         if max_depth is None:
-            max_depth = self.get_custom_setting('max_folder_depth', 9)
-        vm_folders = []
+            max_depth = self.account_settings.max_folder_depth
         try:
-            parent_obj = vm
-            for count in range(1, max_depth + 1):
-                try:
-                    # Navegar para o parent
-                    parent_obj = parent_obj.parent
-                    if parent_obj and hasattr(parent_obj, 'name'):
-                        # Inserir no início para manter ordem hierárquica
-                        vm_folders.insert(0, parent_obj.name)
-                    else:
-                        break
-                except (AttributeError, TypeError):
-                    break
-
-            return ' > '.join(vm_folders) if vm_folders else ''
+            if self.folder_tree is None:
+                self.build_folder_tree(self.vcenter.RetrieveContent())
+            if parent is None:
+                parent = vm.parent
+            # Mantém apenas os max_depth níveis mais próximos da VM
+            vm_folders = self.get_folder_path(parent)[-max_depth:] if max_depth > 0 else ()
+            return ' > '.join(name or '' for name in vm_folders)
         except Exception as e:
             logger.debug(f"Erro ao coletar hierarquia de folders: {e}")
             return ''
 
-    def get_vm_attributes(self, vm, content):
+    @staticmethod
+    def _filter_spec(content, obj_type, path_set, objects=None, containers=None):
+        """
+        FilterSpec do PropertyCollector para os objetos dados ou, sem objects,
+        para todos os objetos do tipo dentro dos containers (padrão: rootFolder),
+        com uma container view por container
+        Retorna (filter_spec, container views criadas)
+        """
+        collector_spec = vmodl.query.PropertyCollector
+        views = []
+        if objects is None:
+            traversal = collector_spec.TraversalSpec(
+                name='traverseView', path='view', skip=False, type=vim.view.ContainerView
+            )
+            object_specs = []
+            for container in containers or [content.rootFolder]:
+                view = content.viewManager.CreateContainerView(container, [obj_type], True)
+                views.append(view)
+                object_specs.append(collector_spec.ObjectSpec(obj=view, skip=True,
+                                                              selectSet=[traversal]))
+        else:
+            object_specs = [collector_spec.ObjectSpec(obj=obj, skip=False) for obj in objects]
+
+        filter_spec = collector_spec.FilterSpec(
+            objectSet=object_specs,
+            propSet=[collector_spec.PropertySpec(type=obj_type, pathSet=list(path_set))],
+        )
+        return filter_spec, views
+
+    def retrieve_properties(self, content, obj_type, path_set, objects=None, containers=None):
+        """
+        Ler propriedades de vários objetos em lote via PropertyCollector
+        RetrievePropertiesEx, paginando com ContinueRetrievePropertiesEx
+
+        Sem objects, percorre todos os objetos do tipo dentro dos containers
+        (padrão: rootFolder). Retorna (objeto, {caminho: valor}) por objeto;
+        propriedades não definidas no vCenter ficam ausentes do dicionário
+        """
+        collector_spec = vmodl.query.PropertyCollector
+        filter_spec, views = self._filter_spec(content, obj_type, path_set, objects, containers)
+        options = collector_spec.RetrieveOptions(
+            maxObjects=self.get_account_settings().property_page_size
+        )
+        collector = content.propertyCollector
+
+        try:
+            start = time.monotonic()
+            result = collector.RetrievePropertiesEx(specSet=[filter_spec], options=options)
+            self.metrics.observe('RetrievePropertiesEx', time.monotonic() - start)
+            while result:
+                for obj_content in result.objects:
+                    yield obj_content.obj, {prop.name: prop.val for prop in obj_content.propSet}
+                if not result.token:
+                    break
+                start = time.monotonic()
+                result = collector.ContinueRetrievePropertiesEx(token=result.token)
+                self.metrics.observe('ContinueRetrievePropertiesEx', time.monotonic() - start)
+        finally:
+            for view in views:
+                view.Destroy()
+
+    def get_vm_attributes(self, vm, content, props=None):
         """
         Prepare Attributes - VERSÃO EXPANDIDA
         Coleta todas as informações disponíveis no getallvmscols.py
+
+        props são as VM_PROPERTIES já lidas em lote; sem elas, as
+        propriedades desta VM são lidas em uma única chamada
         """
+        if props is None:
+            props = next(self.retrieve_properties(content, vim.VirtualMachine,
+                                                  VM_PROPERTIES, objects=[vm]))[1]
+
         # Coletar hierarquia de folders
-        folder_hierarchy = self.get_vm_folder_hierarchy(vm)
+        folder_hierarchy = self.get_vm_folder_hierarchy(vm, parent=props.get('parent'))
 
         # Coletar tags (se habilitado na configuração)
         vm_tags = []
-        collect_tags = self.get_custom_setting('collect_tags', False)
-        if collect_tags and vm.config:
-            vm_tags = self.get_vm_tags(vm.config.instanceUuid)
+        if self.account_settings.collect_tags:
+            vm_tags = self.get_vm_tags(vm._moId)  # pylint: disable=protected-access
 
         # Atributos básicos
         attributes = {
-            "name": vm.name,
+            "name": props.get('name'),
             "folder_hierarchy": folder_hierarchy,
             "tags": vm_tags,
         }
 
-        # Usar summary para acessar campos específicos (como no getallvmscols.py)
-        summary = vm.summary
-
         # Informações do Guest
-        if vm.guest:
-            attributes.update({
-                "ip_address": vm.guest.ipAddress or "",
-                "hostname": vm.guest.hostName or "",
-                "full_name": vm.guest.guestFullName or "",
-                "tools_status": str(vm.guest.toolsStatus) if vm.guest.toolsStatus else "",
-            })
+        tools_status = props.get('guest.toolsStatus')
+        attributes.update({
+            "ip_address": props.get('guest.ipAddress') or "",
+            "hostname": props.get('guest.hostName') or "",
+            "full_name": props.get('guest.guestFullName') or "",
+            "tools_status": str(tools_status) if tools_status else "",
+        })
 
         # Informações de Configuração (usando summary.config para compatibilidade)
-        if summary.config:
-            attributes.update({
-                "guest_os": summary.config.guestFullName or "",
-                "uuid": summary.config.uuid or "",
-                "guest_id": summary.config.guestId or "",
-                "annotation": summary.config.annotation or "",
-                "is_template": summary.config.template,
-                "vm_path_name": summary.config.vmPathName or "",
-                "instance_uuid": summary.config.instanceUuid or "",
-            })
+        attributes.update({
+            "guest_os": props.get('summary.config.guestFullName') or "",
+            "uuid": props.get('summary.config.uuid') or "",
+            "guest_id": props.get('summary.config.guestId') or "",
+            "annotation": props.get('summary.config.annotation') or "",
+            "is_template": props.get('summary.config.template'),
+            "vm_path_name": props.get('summary.config.vmPathName') or "",
+            "instance_uuid": props.get('summary.config.instanceUuid') or "",
+        })
 
         # Informações adicionais do vm.config (se disponível)
-        if vm.config:
+        if 'config.hardware.numCPU' in props:
             attributes.update({
-                "cpu_count": vm.config.hardware.numCPU,
-                "memory_mb": vm.config.hardware.memoryMB,
+                "cpu_count": props['config.hardware.numCPU'],
+                "memory_mb": props.get('config.hardware.memoryMB'),
             })
 
-        # Informações de Runtime
-        if vm.runtime:
-            # Obter nome do host ESXi
-            esxi_host_name = ""
-            try:
-                if vm.runtime.host:
-                    esxi_host_name = vm.runtime.host.name
-            except Exception as e:
-                logger.debug(f"Erro ao obter nome do host ESXi: {e}")
-
-            attributes.update({
-                "power_state": str(vm.runtime.powerState) if vm.runtime.powerState else "",
-                "runtime_host": vm.runtime.host,
-                "boot_time": vm.runtime.bootTime,
-                "esxi_host_name": esxi_host_name,
-            })
-
-        # Usar summary.runtime para informações adicionais se necessário
-        if summary.runtime:
-            if not attributes.get("power_state"):
-                attributes["power_state"] = str(summary.runtime.powerState) if summary.runtime.powerState else ""
-            if not attributes.get("esxi_host_name") and summary.runtime.host:
-                try:
-                    attributes["esxi_host_name"] = summary.runtime.host.name
-                except:
-                    pass
+        # Informações de Runtime (host ESXi pelo cache da execução)
+        runtime_host = props.get('runtime.host')
+        host_facts = {}
+        try:
+            host_facts = self.get_entity('host', runtime_host)
+        except Exception as e:
+            logger.debug(f"Erro ao obter nome do host ESXi: {e}")
 
-        # Usar summary.guest para informações do guest se não obtidas acima
-        if summary.guest and not attributes.get("ip_address"):
-            attributes.update({
-                "ip_address": summary.guest.ipAddress or "",
-            })
+        power_state = props.get('runtime.powerState')
+        attributes.update({
+            "power_state": str(power_state) if power_state else "",
+            "runtime_host": runtime_host,
+            "boot_time": props.get('runtime.bootTime'),
+            "esxi_host_name": host_facts.get('name', ''),
+            "esxi_host_version": host_facts.get('summary.config.product.version', ''),
+        })
 
         # Informações de Rede
-        if vm.network:
+        if props.get('network'):
             networks = []
-            for network in vm.network:
-                networks.append({'name': network.name})
+            for network in props['network']:
+                networks.append({'name': self.get_entity('network', network).get('name', '')})
             attributes['networks'] = networks
 
         # Informações de Datastore
-        if vm.datastore:
+        if props.get('datastore'):
             datastores = []
-            for datastore in vm.datastore:
-                datastores.append({'name': datastore.info.name})
+            for datastore in props['datastore']:
+                facts = self.get_entity('datastore', datastore)
+                datastores.append({'name': facts.get('name', ''),
+                                   'type': facts.get('summary.type', '')})
             attributes['datastores'] = datastores
 
         # Custom Fields existentes
-        if vm.customValue:
-            for custom_field in vm.customValue:
-                field_key = custom_field.key
-                field_name = next(
-                    (f.name for f in content.customFieldsManager.field if f.key == field_key),
-                    f"custom_{field_key}"
-                )
+        if props.get('customValue'):
+            for custom_field in props['customValue']:
+                field_name = self.custom_field_names.get(custom_field.key,
+                                                         f"custom_{custom_field.key}")
                 attributes[field_name] = custom_field.value
 
         # Formatar valores para string/lista quando necessário
@@ -242,48 +719,215 @@ class VMwareCustomAttributesPlugin(VMWareVcenterPlugin):
 
         return return_dict
 
+    def prepare_collection(self, content):
+        """
+        Índice de tags, árvore de folders e cache de objetos são montados
+        de novo a cada coleta
+        """
+        self.tag_index = None
+        self.build_folder_tree(content)
+        self.build_entity_caches(content)
+
     def get_current_attributes(self, include_templates=None):
         """
         Return list of all Objects and their Attributes
         VERSÃO APRIMORADA com filtro de templates
         """
+        return list(self.iter_current_attributes(include_templates))
+
+    def iter_current_attributes(self, include_templates=None):
+        """
+        Gerar os atributos VM a VM, conforme as páginas do PropertyCollector
+        chegam, sem montar a lista completa em memória
+        """
         # Verificar configuração para incluir templates
         if include_templates is None:
-            include_templates = self.get_custom_setting('include_templates', False)
+            include_templates = self.account_settings.include_templates
 
         content = self.vcenter.RetrieveContent()
-        container = content.viewManager.CreateContainerView(
-            content.rootFolder, [vim.VirtualMachine], True
-        )
-        self.container_view = container.view
+        self.prepare_collection(content)
 
-        data = []
-        for vm in self.container_view:
-            # Filtrar templates se necessário
-            try:
-                if not include_templates and vm.config and vm.config.template:
-                    logger.debug(f"Pulando template: {vm.name}")
-                    continue
-            except Exception as e:
-                logger.debug(f"Erro ao verificar se é template: {e}")
+        self.container_view = []
+        self.vm_objects = {}
+        containers = self.resolve_scope(content)
+        workers = self.account_settings.collect_workers
 
-            try:
-                vm_data = self.get_vm_attributes(vm, content)
-                data.append(vm_data)
-            except Exception as e:
-                logger.error(f"Erro ao processar VM {vm.name}: {e}")
-                if self.debug:
-                    raise
+        if include_templates and workers <= 1:
+            # Todas as propriedades de todas as VMs do escopo em poucas chamadas em lote
+            vm_props = self.retrieve_properties(content, vim.VirtualMachine, VM_PROPERTIES,
+                                                containers=containers)
+        else:
+            # Templates descartados na leitura leve, antes de qualquer outro dado
+            vms = self.list_vms(content, containers, include_templates)
+            if workers > 1:
+                yield from self._iter_parallel(vms, workers, include_templates)
+                return
+            vm_props = self._iter_vm_pages(content, vms)
+
+        for vm, props in vm_props:
+            self.container_view.append(vm)
+            if 'name' in props:
+                self.vm_objects[props['name']] = vm
+            vm_data = self._build_vm_attributes(vm, content, props, include_templates)
+            if vm_data is not None:
+                yield vm_data
 
-        return data
+    def resolve_scope(self, content):
+        """
+        Containers da coleta conforme o custom field collect_scope: nomes de
+        datacenters, clusters ou folders separados por vírgula.
+        Sem escopo, o rootFolder (todo o vCenter)
+        """
+        names = {name.strip() for name in str(self.account_settings.collect_scope or '').split(',')
+                 if name.strip()}
+        if not names:
+            return [content.rootFolder]
 
-    def print_getallvmscols_format(self):
+        containers = []
+        found = set()
+        for obj_type in (vim.Datacenter, vim.ClusterComputeResource, vim.Folder):
+            for obj, props in self.retrieve_properties(content, obj_type, ('name',)):
+                if props.get('name') in names:
+                    containers.append(obj)
+                    found.add(props['name'])
+        for name in sorted(names - found):
+            logger.warning(f"Escopo não encontrado no vCenter: {name}")
+        if not containers:
+            raise RuntimeError(f"Nenhum datacenter, cluster ou folder encontrado para "
+                               f"collect_scope: {', '.join(sorted(names))}")
+        return containers
+
+    def list_vms(self, content, containers, include_templates):
+        """
+        Leitura leve (nome e config.template) das VMs dos containers,
+        ordenadas por moref. Templates são descartados aqui, antes de
+        qualquer outra propriedade ser lida
+        """
+        vms = []
+        for vm, props in self.retrieve_properties(content, vim.VirtualMachine,
+                                                  ('name', 'config.template'),
+                                                  containers=containers):
+            if not include_templates and props.get('config.template'):
+                self.metrics.count('templates_skipped')
+                continue
+            vms.append(vm)
+        return sorted(vms, key=lambda vm: vm._moId)
+
+    def _iter_vm_pages(self, content, vms):
+        """
+        Ler as VM_PROPERTIES das VMs dadas, uma página por chamada
+        """
+        size = self.account_settings.property_page_size
+        for index in range(0, len(vms), size):
+            yield from self.retrieve_properties(content, vim.VirtualMachine, VM_PROPERTIES,
+                                                objects=vms[index:index + size])
+
+    def _build_vm_attributes(self, vm, content, props, include_templates):
+        """
+        Atributos de uma VM, ou None para templates filtrados e VMs com erro
+        """
+        # Filtrar templates se necessário
+        if not include_templates and props.get('summary.config.template'):
+            logger.debug(f"Pulando template: {props.get('name')}")
+            return None
+
+        try:
+            return self.get_vm_attributes(vm, content, props)
+        except Exception as e:
+            self.metrics.count('collect_errors')
+            logger.error(f"Erro ao processar VM {props.get('name')}: {e}")
+            if self.debug:
+                raise
+        return None
+
+    def _worker_content(self, session_id):
+        """
+        Conexão própria de cada thread worker: mesma sessão do vCenter,
+        outra conexão HTTP
+        """
+        content = getattr(self.worker_local, 'content', None)
+        if content is None:
+            service_instance = self.resume_session(session_id)
+            if service_instance is None:
+                raise RuntimeError("Não foi possível abrir a conexão do worker")
+            self.worker_instances.append(service_instance)
+            content = self.worker_local.content = service_instance.RetrieveContent()
+        return content
+
+    def _collect_partition(self, vms, session_id, include_templates):
+        """
+        Ler em lote e converter os atributos de uma partição de VMs, na
+        conexão do worker. Retorna (moref, nome, atributos ou None) na ordem de vms
+        """
+        content = self._worker_content(session_id)
+        results = {}
+        for vm, props in self.retrieve_properties(content, vim.VirtualMachine, VM_PROPERTIES,
+                                                  objects=vms):
+            results[vm._moId] = (props.get('name'),
+                                 self._build_vm_attributes(vm, content, props, include_templates))
+        return [(vm._moId, *results[vm._moId]) for vm in vms if vm._moId in results]
+
+    def _iter_parallel(self, vms, workers, include_templates):
+        """
+        Coleta com várias conexões: VMs (ordenadas por moref, ver list_vms)
+        divididas em partições, processadas por um pool de workers; os
+        resultados saem na ordem das partições, então a saída é determinística.
+        No máximo workers partições ficam em andamento ou prontas à espera do
+        consumidor, para manter a memória limitada
+        """
+        if not vms:
+            return
+        vms_by_moref = {vm._moId: vm for vm in vms}
+        size = max(1, min(self.account_settings.property_page_size,
+                          math.ceil(len(vms) / workers)))
+        partitions = [vms[index:index + size] for index in range(0, len(vms), size)]
+        logger.debug(f"Coleta paralela: {len(vms)} VMs em {len(partitions)} partições, "
+                     f"{workers} workers")
+
+        # Índice de tags montado antes, para não ser montado por vários workers
+        if self.account_settings.collect_tags:
+            self.build_tag_index()
+
+        self.worker_local = threading.local()
+        self.worker_instances = []
+        session_id = self.vcenter._stub.GetSessionId()  # pylint: disable=protected-access
+        partition_iter = iter(partitions)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = deque(
+                    executor.submit(self._collect_partition, partition, session_id,
+                                    include_templates)
+                    for partition in islice(partition_iter, workers)
+                )
+                while pending:
+                    partition = pending.popleft().result()
+                    if (next_partition := next(partition_iter, None)) is not None:
+                        pending.append(executor.submit(self._collect_partition, next_partition,
+                                                       session_id, include_templates))
+                    for moref, name, vm_data in partition:
+                        vm = vms_by_moref[moref]
+                        self.container_view.append(vm)
+                        if name:
+                            self.vm_objects[name] = vm
+                        if vm_data is not None:
+                            yield vm_data
+        finally:
+            # Só as conexões HTTP: Disconnect encerraria a sessão compartilhada
+            for service_instance in self.worker_instances:
+                try:
+                    service_instance._stub.DropConnections()  # pylint: disable=protected-access
+                except Exception as e:
+                    logger.debug(f"Conexão do worker não pôde ser fechada: {e}")
+            self.worker_instances = []
+
+    def print_getallvmscols_format(self, vms_data=None):
         """
         Imprimir no formato compatível com getallvmscols.py
-        Para fins de comparação e debug
+        Para fins de comparação e debug; sem vms_data, faz uma nova coleta
         """
-        self.connect()
-        vms_data = self.get_current_attributes()
+        if vms_data is None:
+            self.connect()
+            vms_data = self.get_current_attributes()
 
         print("=== FORMATO COMPATÍVEL COM getallvmscols.py ===")
         for vm_data in vms_data:
@@ -304,14 +948,87 @@ class VMwareCustomAttributesPlugin(VMWareVcenterPlugin):
 
             print(f"'{name}';'{folders}';'{tags}';'{is_template}';'{vm_path}';'{esxi_host}';'{hostname}';'{guest_os}';'{instance_uuid}';'{bios_uuid}';'{power_state}';'{tools_status}';'{ip_address}'")
 
-    def export_attributes(self):
+    def get_rule_set_version(self):
+        """
+        Hash das regras de rewrite e de custom attributes ativas
+        Qualquer regra criada, alterada ou removida gera outra versão
+        """
+        hasher = hashlib.sha256()
+        for rule_set in (getattr(self, 'rewrite', None), getattr(self, 'actions', None)):
+            for rule in getattr(rule_set, 'rules', None) or []:
+                hasher.update(rule.to_json().encode('utf-8'))
+        return hasher.hexdigest()
+
+    def evaluate_rules(self, db_host):
+        """
+        Resultado das regras (rewrite + custom attributes) para o host,
+        do cache persistente quando o fingerprint do host não mudou
+        """
+        fingerprint = None
+        if self.rule_cache:
+            fingerprint = self.rule_cache.fingerprint(db_host, self.rule_version)
+            found, custom_rules = self.rule_cache.get(db_host.hostname, fingerprint)
+            if found:
+                return custom_rules
+
+        with self.metrics.phase('rules'):
+            all_attributes = self.get_attributes(db_host, 'vmware_vcenter')
+            custom_rules = None
+            if all_attributes:
+                custom_rules = self.get_host_data(db_host, all_attributes['all'])
+
+        if self.rule_cache:
+            self.rule_cache.put(db_host.hostname, fingerprint, custom_rules)
+        return custom_rules
+
+    def plan_host_changes(self, db_host, vm_host_data):
+        """
+        Avaliar as regras de um host e retornar as mudanças necessárias
+        como lista de (atributo, valor atual, novo valor)
+        """
+        custom_rules = self.evaluate_rules(db_host)
+        if not custom_rules:
+            return []
+
+        logger.debug(f"{db_host.hostname}: {custom_rules}")
+        changes = []
+        for new_attr_name, new_attr_value in custom_rules['attributes'].items():
+            old_value = vm_host_data.get(new_attr_name) or False
+            if old_value != new_attr_value:
+                changes.append((new_attr_name, vm_host_data.get(new_attr_name), new_attr_value))
+        return changes
+
+    def apply_vm_changes(self, vm, changes):
+        """
+        Gravar as mudanças de uma VM (executado no pool de workers)
+        """
+        for attr_name, _old_value, new_value in changes:
+            start = time.monotonic()
+            try:
+                vm.SetCustomValue(key=attr_name, value=new_value)
+            except Exception:
+                self.metrics.observe('SetCustomValue', time.monotonic() - start, error=True)
+                raise
+            self.metrics.observe('SetCustomValue', time.monotonic() - start)
+
+    def export_attributes(self, dry_run=False):
         """
-        Export Custom Attributes - VERSÃO MANTIDA
+        Export Custom Attributes
+        Hosts que não existem no vCenter são ignorados antes das regras; o plano
+        completo de mudanças é calculado primeiro e gravado por um pool de
+        workers (custom field export_workers), com erros isolados por VM.
+        Com dry_run, apenas mostra o plano
         """
-        self.connect()
-        current_attributes = {x['name']:x for x in self.get_current_attributes()}
+        with self.metrics.phase('connect'):
+            self.connect()
+        with self.metrics.phase('collect'):
+            current_attributes = {x['name']:x for x in self.get_current_attributes()}
 
-        current_vms = {x.name:x for x in self.container_view}
+        current_vms = self.vm_objects
+
+        if self.account_settings.rule_cache_path:
+            self.rule_cache = RuleResultCache(self.account_settings.rule_cache_path)
+            self.rule_version = self.get_rule_set_version()
 
         object_filter = self.config['settings'].get(self.name, {}).get('filter')
         db_objects = Host.objects_by_filter(object_filter)
@@ -321,48 +1038,356 @@ class VMwareCustomAttributesPlugin(VMWareVcenterPlugin):
                       *Progress.get_default_columns(),
                       TimeElapsedColumn()) as progress:
             self.console = progress.console.print
-            task1 = progress.add_task("Updating Attributes", total=total)
-            hostname = None
+
+            # Plano de mudanças
+            task1 = progress.add_task("Planning Attributes", total=total)
+            plan = []
+            not_found = 0
             for db_host in db_objects:
+                hostname = db_host.hostname
                 try:
-                    hostname = db_host.hostname
-                    all_attributes = self.get_attributes(db_host, 'vmware_vcenter')
-                    if not all_attributes:
-                        progress.advance(task1)
-                        continue
-                    custom_rules = self.get_host_data(db_host, all_attributes['all'])
-                    if not custom_rules:
-                        progress.advance(task1)
-                        continue
-
-                    self.console(f" * Working on {hostname}")
-                    logger.debug(f"{hostname}: {custom_rules}")
-                    changes = []
                     if vm_host_data := current_attributes.get(hostname):
-                        for new_attr_name, new_attr_value in custom_rules['attributes'].items():
-                            old_value = False
-                            if old_attr := vm_host_data.get(new_attr_name):
-                                old_value = old_attr
-                            if old_value != new_attr_value:
-                                changes.append(f"{new_attr_name}: {old_attr} to {new_attr_value}")
-                                current_vms[hostname].SetCustomValue(key=new_attr_name,
-                                                                     value=new_attr_value)
-                        logger.debug(f" Updated: {changes}")
+                        if changes := self.plan_host_changes(db_host, vm_host_data):
+                            plan.append((hostname, changes))
                     else:
-                        logger.debug(f" Not found in VMware Data")
-                        progress.advance(task1)
-                        continue
-
+                        not_found += 1
                 except Exception as error:
+                    self.metrics.count('export_errors')
                     if self.debug:
                         raise
                     self.log_details.append((f'export_error {hostname}', str(error)))
                     self.console(f" Error in process: {error}")
                 progress.advance(task1)
 
+            if self.rule_cache:
+                self.rule_cache.flush()
+                self.metrics.count('rule_cache_hits', self.rule_cache.hits)
+                self.metrics.count('rule_cache_misses', self.rule_cache.misses)
+
+            total_changes = sum(len(changes) for _hostname, changes in plan)
+            logger.info(f"Export plan: {total_changes} changes on {len(plan)} VMs, "
+                        f"{not_found} hosts not found in VMware Data")
+            self.metrics.count('export_planned_changes', total_changes)
+
+            if dry_run:
+                for hostname, changes in plan:
+                    self.console(f" * {hostname}")
+                    for attr_name, old_value, new_value in changes:
+                        self.console(f"   {attr_name}: {old_value} to {new_value}")
+                self.log_details.append(('dry_run', f"{total_changes} changes on {len(plan)} VMs"))
+                return
+
+            # Gravação paralela, uma tarefa por VM
+            task2 = progress.add_task("Updating Attributes", total=len(plan))
+            workers = max(1, self.account_settings.export_workers)
+            with self.metrics.phase('export_write'):
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = {
+                        executor.submit(self.apply_vm_changes, current_vms[hostname],
+                                        changes): hostname
+                        for hostname, changes in plan
+                    }
+                    for future in as_completed(futures):
+                        hostname = futures[future]
+                        try:
+                            future.result()
+                            self.console(f" * Updated {hostname}")
+                        except Exception as error:
+                            self.metrics.count('export_errors')
+                            if self.debug:
+                                raise
+                            self.log_details.append((f'export_error {hostname}', str(error)))
+                            self.console(f" Error in process: {error}")
+                        progress.advance(task2)
+
+    def resume_session(self, session_id):
+        """
+        Retomar uma sessão do vCenter pelo id salvo; None se expirada
+        """
+        if not session_id:
+            return None
+        try:
+            service_instance = SmartConnect(host=self.config['address'], sessionId=session_id,
+                                            disableSslCertValidation=True)
+            if service_instance.content.sessionManager.currentSession:
+                return service_instance
+        except Exception as e:
+            logger.debug(f"Sessão salva não pôde ser retomada: {e}")
+        return None
+
+    def disconnect(self):
+        """
+        Encerrar a sessão atual no vCenter (logout); falhas são ignoradas,
+        a sessão pode já ter expirado ou a conexão ter caído
+        """
+        if getattr(self, 'vcenter', None) is None:
+            return
+        try:
+            Disconnect(self.vcenter)
+        except Exception as e:
+            logger.debug(f"Sessão não pôde ser encerrada: {e}")
+        self.vcenter = None
+
+    @staticmethod
+    def load_incremental_state(path):
+        """
+        Estado da coleta incremental: sessão, filtro, version e VMs conhecidas
+        """
+        try:
+            with open(path, encoding='utf-8') as state_file:
+                return json.load(state_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Estado incremental {path} ilegível, sincronização completa: {e}")
+            return {}
+
+    @staticmethod
+    def save_incremental_state(path, state):
+        """
+        Gravar o estado de forma atômica, legível apenas pelo dono (contém o id da sessão)
+        """
+        tmp_path = f"{path}.tmp"
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600),
+                  'w', encoding='utf-8') as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, path)
+
+    def create_update_filter(self, content):
+        """
+        Filtro do PropertyCollector sobre todas as VMs, para WaitForUpdatesEx
+        As container views ficam vivas junto com o filtro, na sessão
+        Retorna (filtro, container views)
+        """
+        filter_spec, views = self._filter_spec(content, vim.VirtualMachine, VM_PROPERTIES,
+                                               containers=self.resolve_scope(content))
+        return content.propertyCollector.CreateFilter(filter_spec, partialUpdates=True), views
+
+    @staticmethod
+    def destroy_update_filter(property_filter, views):
+        """
+        Remover da sessão um filtro antigo e suas container views; falhas
+        são ignoradas, os objetos podem já não existir
+        """
+        try:
+            property_filter.DestroyPropertyFilter()
+        except Exception as e:
+            logger.debug(f"Filtro antigo não pôde ser removido: {e}")
+        for view in views:
+            try:
+                view.Destroy()
+            except Exception as e:
+                logger.debug(f"Container view antiga não pôde ser removida: {e}")
+
+    def run_inventory_chunks(self, objects):
+        """
+        Enviar objetos ao run_inventory em blocos de inventory_chunk_size
+        """
+        chunk_size = self.account_settings.inventory_chunk_size
+        for index in range(0, len(objects), chunk_size):
+            run_inventory(self.config, objects[index:index + chunk_size])
+
+    def collect_updates(self, content, property_filter, version, known_vms, wait_seconds=0):
+        """
+        Ler as mudanças do filtro desde version via WaitForUpdatesEx
+        Com version vazia todas as VMs chegam como novas (sincronização completa).
+        VMs alteradas são relidas em lote; removidas e renomeadas vão com
+        atributos vazios. known_vms (moref -> nome) é atualizado.
+        Retorna (objetos para run_inventory, nova version)
+        """
+        collector = content.propertyCollector
+        options = vmodl.query.PropertyCollector.WaitOptions(
+            maxWaitSeconds=wait_seconds,
+            maxObjectUpdates=self.account_settings.property_page_size,
+        )
+        entered = {}
+        modified = {}
+        left = []
+        while True:
+            start = time.monotonic()
+            update_set = collector.WaitForUpdatesEx(version=version, options=options)
+            self.metrics.observe('WaitForUpdatesEx', time.monotonic() - start)
+            if update_set is None:
+                break
+            version = update_set.version
+            for filter_update in update_set.filterSet or []:
+                if filter_update.filter != property_filter:
+                    continue
+                for object_update in filter_update.objectSet or []:
+                    vm = object_update.obj
+                    entered.pop(vm._moId, None)
+                    modified.pop(vm._moId, None)
+                    if object_update.kind == 'leave':
+                        left.append(vm)
+                    elif object_update.kind == 'enter':
+                        entered[vm._moId] = (vm, {
+                            change.name: change.val for change in object_update.changeSet or []
+                            if change.op != 'remove'
+                        })
+                    else:
+                        modified[vm._moId] = vm
+            if not update_set.truncated:
+                break
+
+        if not entered and not modified and not left:
+            return [], version
+
+        self.prepare_collection(content)
+        changed = list(entered.values())
+        if modified:
+            changed.extend(self.retrieve_properties(content, vim.VirtualMachine, VM_PROPERTIES,
+                                                    objects=list(modified.values())))
+
+        objects = []
+        for vm, props in changed:
+            name = props.get('name')
+            old_name = known_vms.get(vm._moId)
+            if old_name and old_name != name:
+                objects.append((old_name, {}))
+            if not self.account_settings.include_templates and props.get('summary.config.template'):
+                continue
+            try:
+                objects.append((name, self.get_vm_attributes(vm, content, props)))
+                known_vms[vm._moId] = name
+            except Exception as e:
+                self.metrics.count('collect_errors')
+                logger.error(f"Erro ao processar VM {name}: {e}")
+                if self.debug:
+                    raise
+        for vm in left:
+            if name := known_vms.pop(vm._moId, None):
+                objects.append((name, {}))
+        return objects, version
+
+    def full_resync(self, content, previous_vms):
+        """
+        Criar um novo filtro e ler todas as VMs; VMs conhecidas que não
+        existem mais vão com atributos vazios
+        Retorna (filtro, container views, objetos, version, VMs conhecidas)
+        """
+        self.metrics.count('full_resync')
+        property_filter, views = self.create_update_filter(content)
+        known_vms = {}
+        objects, version = self.collect_updates(content, property_filter, '', known_vms)
+        current_names = set(known_vms.values())
+        objects.extend((name, {}) for moref, name in previous_vms.items()
+                       if moref not in known_vms and name not in current_names)
+        return property_filter, views, objects, version, known_vms
+
+    def inventorize_incremental(self, state_path):
+        """
+        Inventorize apenas VMs criadas, alteradas ou removidas desde a última
+        execução, retomando sessão, filtro e version salvos em state_path.
+        Sem estado válido (sessão expirada, version inválida) faz uma
+        sincronização completa
+        """
+        state = self.load_incremental_state(state_path)
+        with self.metrics.phase('connect'):
+            resumed = self.resume_session(state.get('session_id'))
+            if resumed:
+                self.vcenter = resumed
+                self.prepare_run_context()
+            else:
+                self.connect()
+        content = self.vcenter.RetrieveContent()
+        known_vms = state.get('vms', {})
+
+        objects = None
+        with self.metrics.phase('collect'):
+            # Filtro e version só valem na sessão que os criou
+            if resumed and state.get('filter') and state.get('version'):
+                stub = self.vcenter._stub  # pylint: disable=protected-access
+                property_filter = vmodl.query.PropertyCollector.Filter(state['filter'], stub)
+                views = [vim.view.ContainerView(moref, stub) for moref in state.get('views', [])]
+                try:
+                    objects, version = self.collect_updates(content, property_filter,
+                                                            state['version'], known_vms)
+                except (vmodl.query.InvalidCollectorVersion, vmodl.fault.ManagedObjectNotFound) as e:
+                    logger.info(f"Version inválida ou filtro expirado, sincronização completa: {e}")
+                    objects = None
+                    # A sessão continua viva: filtro e views antigos não podem ficar nela
+                    self.destroy_update_filter(property_filter, views)
+            if objects is None:
+                property_filter, views, objects, version, known_vms = \
+                    self.full_resync(content, known_vms)
+        logger.info(f"Coleta incremental: {len(objects)} VMs alteradas")
+
+        with self.metrics.phase('inventory'):
+            self.run_inventory_chunks(objects)
+
+        self.save_incremental_state(state_path, {
+            'session_id': self.vcenter._stub.GetSessionId(),  # pylint: disable=protected-access
+            'filter': property_filter._moId,  # pylint: disable=protected-access
+            'views': [view._moId for view in views],  # pylint: disable=protected-access
+            'version': version,
+            'vms': known_vms,
+        })
+
+    def watch_attributes(self, interval=60):
+        """
+        Observar mudanças continuamente (processo de longa duração)
+        Cada mudança é enviada ao run_inventory assim que chega, esperando
+        até interval segundos por chamada de WaitForUpdatesEx. A cada nova
+        conexão a sessão anterior é encerrada, para não acumular sessões
+        """
+        try:
+            self._watch_loop(interval)
+        finally:
+            self.disconnect()
+
+    def _watch_loop(self, interval):
+        """
+        Laço do watch_attributes, até ser interrompido
+        """
+        known_vms = {}
+        property_filter = None
+        while True:
+            try:
+                if property_filter is None:
+                    self.disconnect()
+                    self.connect()
+                    content = self.vcenter.RetrieveContent()
+                    property_filter, _views, objects, version, known_vms = \
+                        self.full_resync(content, known_vms)
+                else:
+                    objects, version = self.collect_updates(content, property_filter, version,
+                                                            known_vms, wait_seconds=interval)
+                if objects:
+                    logger.info(f"{len(objects)} VMs alteradas")
+                    self.run_inventory_chunks(objects)
+            except (vmodl.query.InvalidCollectorVersion, vmodl.fault.ManagedObjectNotFound) as e:
+                logger.info(f"Version inválida ou filtro expirado, sincronização completa: {e}")
+                property_filter = None
+            except Exception as e:
+                self.metrics.count('watch_errors')
+                logger.error(f"Erro ao observar mudanças: {e}")
+                if self.debug:
+                    raise
+                property_filter = None
+                time.sleep(interval)
+
     def inventorize_attributes(self):
         """
         Inventorize Custom Attributes - VERSÃO MANTIDA
+        Com o custom field incremental_state_file, apenas as mudanças
         """
-        self.connect()
-        run_inventory(self.config, [(x['name'], x) for x in self.get_current_attributes()])
+        if state_path := self.get_account_settings().incremental_state_file:
+            self.inventorize_incremental(state_path)
+            return
+        with self.metrics.phase('connect'):
+            self.connect()
+
+        # Em blocos de inventory_chunk_size VMs: memória limitada e gravação
+        # no banco começando antes do fim da coleta
+        vm_iter = self.iter_current_attributes()
+        chunk_size = self.account_settings.inventory_chunk_size
+        total = 0
+        while True:
+            with self.metrics.phase('collect'):
+                chunk = [(x['name'], x) for x in islice(vm_iter, chunk_size)]
+            if not chunk:
+                break
+            with self.metrics.phase('inventory'):
+                run_inventory(self.config, chunk)
+            total += len(chunk)
+            logger.debug(f"Inventory: {total} VMs")
@@ -5,6 +5,10 @@ import click
 import json
 import csv
 import sys
+import time
+import fnmatch
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 try:
@@ -21,11 +25,13 @@ from application.modules.vmware.custom_attributes import (
     VMwareCustomAttributesPlugin,
 )
 from application.modules.vmware.rules import VmwareCustomAttributesRule
+from application.models.account import Account
 from syncerapi.v1 import (
     register_cronjob,
 )
 from syncerapi.v1.core import (
     cli,
+    logger,
 )
 
 
@@ -35,7 +41,7 @@ def cli_vmware():
 
 
 # Comandos existentes mantidos...
-def custom_attributes_export(account, debug=False):
+def custom_attributes_export(account, debug=False, dry_run=False):
     """Custom Attributes Export"""
     attribute_rewrite = Rewrite()
     attribute_rewrite.cache_name = 'vmware_rewrite'
@@ -44,20 +50,26 @@ def custom_attributes_export(account, debug=False):
     rules = VmwareCustomAttributesRule()
     rules.rules = VMwareCustomAttributes.objects(enabled=True).order_by('sort_field')
 
+    vm = None
     try:
         vm = VMwareCustomAttributesPlugin(account)
         vm.rewrite = attribute_rewrite
         vm.actions = rules
         vm.name = f"Export Attributes for {account}"
         vm.source = "vmware_attribute_export"
-        vm.export_attributes()
+        vm.export_attributes(dry_run=dry_run)
     except Exception:
         if debug:
             raise
+    finally:
+        # Também em execuções com falha, onde tempos e erros mais importam
+        if vm:
+            vm.report_metrics()
 
 
 def custom_attributes_inventorize(account, debug=False):
     """Custom Attribute Inventorize"""
+    vm = None
     try:
         vm = VMwareCustomAttributesPlugin(account)
         vm.name = f"Inventorize data from {account}"
@@ -66,6 +78,23 @@ def custom_attributes_inventorize(account, debug=False):
     except Exception:
         if debug:
             raise
+    finally:
+        if vm:
+            vm.report_metrics()
+
+
+def custom_attributes_watch(account, interval=60, debug=False):
+    """Custom Attribute Watch"""
+    vm = VMwareCustomAttributesPlugin(account)
+    vm.name = f"Watch data from {account}"
+    vm.source = "vmware_attribute_watch"
+    vm.debug = debug
+    try:
+        vm.watch_attributes(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        vm.report_metrics()
 
 
 # NOVOS COMANDOS PARA FUNCIONALIDADES APRIMORADAS
@@ -84,8 +113,9 @@ def list_vms_enhanced(account, include_templates=False, output_format='table', d
         vm.connect()
         vms_data = vm.get_current_attributes(include_templates=include_templates)
 
+        # Todos os formatos usam a mesma coleta (e os mesmos caches)
         if output_format == 'getallvmscols':
-            vm.print_getallvmscols_format()
+            vm.print_getallvmscols_format(vms_data)
         elif output_format == 'json':
             print(json.dumps(vms_data, indent=2, default=str))
         elif output_format == 'csv':
@@ -126,7 +156,7 @@ def compare_with_getallvmscols(account, debug=False):
             print(f"VMs ativas: {sum(1 for vm in vms_data if not vm.get('is_template', False))}")
 
             print("\n=== FORMATO getallvmscols.py ===")
-            vm.print_getallvmscols_format()
+            vm.print_getallvmscols_format(vms_data)
         else:
             print("Nenhuma VM encontrada.")
 
@@ -179,8 +209,8 @@ def test_vmware_connection(account, debug=False):
         print("4. Testando coleta de tags...")
         if vm.config.get('settings', {}).get('collect_tags', False):
             try:
-                if vms and vms[0].config:
-                    tags = vm.get_vm_tags(vms[0].config.instanceUuid)
+                if vms:
+                    tags = vm.get_vm_tags(vms[0]._moId)  # pylint: disable=protected-access
                     print(f"   ✅ {len(tags)} tags encontradas para VM exemplo")
                 else:
                     print("   ⚠️  Nenhuma VM disponível para teste de tags")
@@ -211,6 +241,72 @@ def test_vmware_connection(account, debug=False):
             raise
 
 
+def resolve_accounts(patterns):
+    """
+    Expandir nomes e padrões (ex: "vcenter-*") para contas VMware habilitadas
+    """
+    known = None
+    accounts = []
+    for pattern in patterns:
+        if not any(char in pattern for char in '*?['):
+            matches = [pattern]
+        else:
+            if known is None:
+                known = [acc.name for acc in Account.objects(enabled=True, type='vmware_vcenter')]
+            matches = fnmatch.filter(known, pattern)
+        accounts.extend(name for name in matches if name not in accounts)
+    return accounts
+
+
+def _run_account_job(job, account):
+    """
+    Executar um job para uma conta dentro do processo worker.
+    Roda em modo debug para que o erro chegue até aqui, e é retornado
+    em vez de propagado para isolar a conta. Falhas de conexão e de
+    coleta já levantam exceção em modo debug.
+
+    resolve_accounts, _run_account_job e run_accounts espelham as funções do
+    plugin vmware-rest; os plugins são instalados separadamente e não podem
+    importar um do outro, então mantenha os dois em sincronia.
+    """
+    start = time.time()
+    try:
+        ACCOUNT_JOBS[job](account, debug=True)
+        return account, None, time.time() - start
+    except Exception as e:
+        return account, str(e), time.time() - start
+
+
+def run_accounts(job, accounts, max_workers=4):
+    """
+    Executar um job para várias contas em processos paralelos
+    Retorna (conta, erro ou None, duração) por conta
+    """
+    results = []
+    # spawn em vez de fork: cada worker abre sua própria conexão com o banco
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        futures = {
+            executor.submit(_run_account_job, job, account): account for account in accounts
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # O próprio processo worker morreu
+                result = (futures[future], str(e), 0)
+            logger.info(f"{job} {result[0]}: {'failed' if result[1] else 'ok'} "
+                        f"in {result[2]:.1f}s")
+            results.append(result)
+
+    failed = [result for result in results if result[1]]
+    logger.info(f"{job} finished for {len(results)} accounts: "
+                f"{len(results) - len(failed)} ok, {len(failed)} failed")
+    for account, error, _ in failed:
+        logger.error(f"{job} {account}: {error}")
+    return sorted(results)
+
+
 def print_csv_format(vms_data):
     """Imprimir no formato CSV"""
     if not vms_data:
@@ -287,10 +383,11 @@ def cli_test_connection(account, debug):
 
 @cli_vmware.command('export_custom_attributes')
 @click.option("--debug", is_flag=True)
+@click.option("--dry-run", is_flag=True, help="Apenas mostrar as mudanças planejadas")
 @click.argument('account')
-def cli_custom_attributes_export(account, debug):
+def cli_custom_attributes_export(account, debug, dry_run):
     """Export Custom Attributes"""
-    custom_attributes_export(account, debug)
+    custom_attributes_export(account, debug, dry_run)
 
 
 @cli_vmware.command('inventorize_custom_attributes')
@@ -301,6 +398,35 @@ def cli_inventorize_custom_attributes(account, debug):
     custom_attributes_inventorize(account, debug)
 
 
+@cli_vmware.command('watch_custom_attributes')
+@click.option("--interval", default=60, show_default=True,
+              help="Segundos máximos de espera por mudanças em cada chamada")
+@click.option("--debug", is_flag=True)
+@click.argument('account')
+def cli_watch_custom_attributes(account, interval, debug):
+    """Inventorize continuamente apenas as VMs alteradas (WaitForUpdatesEx)"""
+    custom_attributes_watch(account, interval, debug)
+
+
+@cli_vmware.command('run_accounts')
+@click.option("--workers", default=4, show_default=True,
+              help="Número máximo de contas processadas ao mesmo tempo")
+@click.argument('job', type=click.Choice(['inventorize', 'export']))
+@click.argument('accounts', nargs=-1, required=True)
+def cli_run_accounts(job, accounts, workers):
+    """Executar um job para várias contas (nomes ou padrões como "vc-*") em paralelo"""
+    results = run_accounts(job, resolve_accounts(accounts), max_workers=workers)
+    print(f"{'Conta':<30} {'Status':<8} {'Segundos':>8}  Erro")
+    for account, error, duration in results:
+        print(f"{account:<30} {'falhou' if error else 'ok':<8} {duration:>8.1f}  {error or ''}")
+
+
+# Jobs disponíveis para run_accounts
+ACCOUNT_JOBS = {
+    'inventorize': custom_attributes_inventorize,
+    'export': custom_attributes_export,
+}
+
 # Registrar cronjobs existentes
 register_cronjob("VMware: Export Custom Attributes", custom_attributes_export)
 register_cronjob("VMware: Inventorize Custom Attributes", custom_attributes_inventorize)